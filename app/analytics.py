@@ -0,0 +1,250 @@
+"""
+Daily activity rollups and the analytics time series built from them.
+
+``activity_rollups`` holds one row per employee and UTC day with the review,
+rating, feedback and KPI counts of that day. The write endpoints add to it in
+their own transaction, next to the dashboard summary updates, so a time
+series never scans the source tables. It groups the day rows into
+day/week/month/quarter buckets with ``date_trunc`` on PostgreSQL, or the
+equivalent date() modifiers on SQLite.
+
+``rebuild`` recomputes every row from the source tables; run it with
+``python -m app.analytics`` after bulk data changes.
+"""
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import Date, Integer, select, insert, update, delete, func, cast, case, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+
+Rollup = models.ActivityRollup
+
+BUCKETS = ("day", "week", "month", "quarter")
+COUNTERS = ("review_count", "rating_count", "rating_sum", "feedback_count", "kpi_total", "kpi_achieved")
+# Upper bound on the points of a single series
+MAX_POINTS = 1000
+# Rows per INSERT statement during rebuild
+INSERT_CHUNK_SIZE = 5000
+
+
+def _day(created_at: Optional[datetime]) -> date:
+    return (created_at or datetime.utcnow()).date()
+
+
+def _empty_row(employee_id: int, day: date) -> dict:
+    row = {name: 0 for name in COUNTERS}
+    row.update(employee_id=employee_id, day=day, rating_sum=0.0)
+    return row
+
+
+def _ensure(db: Session, keys: list) -> None:
+    """Creates any missing (employee_id, day) rows."""
+    existing = set()
+    for day in {day for _, day in keys}:
+        employee_ids = [employee_id for employee_id, d in keys if d == day]
+        existing.update(db.execute(
+            select(Rollup.employee_id, Rollup.day).where(Rollup.day == day, Rollup.employee_id.in_(employee_ids))
+        ).tuples())
+    missing = [_empty_row(*key) for key in keys if key not in existing]
+    if not missing:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(Rollup), missing)
+    except IntegrityError:
+        # Another request created some of the rows concurrently; insert the rest one by one.
+        for row in missing:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(Rollup).values(**row))
+            except IntegrityError:
+                pass
+
+
+def _bump(db: Session, deltas: dict) -> None:
+    """Adds {(employee_id, day): {counter: delta}} with a single executemany UPDATE."""
+    deltas = {key: values for key, values in deltas.items() if key[0] is not None}
+    if not deltas:
+        return
+    _ensure(db, list(deltas))
+    table = Rollup.__table__
+    db.execute(
+        update(table)
+        .where(table.c.employee_id == bindparam("key_employee"), table.c.day == bindparam("key_day"))
+        .values(**{name: table.c[name] + bindparam(f"delta_{name}") for name in COUNTERS}),
+        [
+            {"key_employee": employee_id, "key_day": day, **{f"delta_{name}": values.get(name, 0) for name in COUNTERS}}
+            for (employee_id, day), values in deltas.items()
+        ],
+    )
+
+
+def record_review(db: Session, review: models.PerformanceReview) -> None:
+    """Adds a newly created (flushed) performance review."""
+    rated = review.rating is not None
+    _bump(db, {(review.employee_id, _day(review.created_at)): {
+        "review_count": 1, "rating_count": int(rated), "rating_sum": review.rating if rated else 0,
+    }})
+
+
+def record_feedback(db: Session, feedback: models.Feedback, delta: int = 1) -> None:
+    """Adds (delta=1) or removes (delta=-1) a feedback entry."""
+    _bump(db, {(feedback.to_user_id, _day(feedback.created_at)): {"feedback_count": delta}})
+
+
+def record_kpi_result(db: Session, result: models.KPIResult) -> None:
+    """Adds a newly created (flushed) KPI result."""
+    record_kpi_results(db, [(result.employee_id, result.status == "Achieved")], _day(result.created_at))
+
+
+def record_kpi_results(db: Session, results: Iterable[Tuple[int, bool]], day: Optional[date] = None) -> None:
+    """Adds a batch of KPI results created on ``day`` (default today), given as (employee_id, achieved) tuples."""
+    day = day or _day(None)
+    deltas = {}
+    for employee_id, achieved in results:
+        values = deltas.setdefault((employee_id, day), {"kpi_total": 0, "kpi_achieved": 0})
+        values["kpi_total"] += 1
+        values["kpi_achieved"] += int(achieved)
+    _bump(db, deltas)
+
+
+def _as_date(value) -> date:
+    # SQLite returns date() results as ISO strings
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value.date() if isinstance(value, datetime) else value
+
+
+def rebuild(db: Session) -> int:
+    """
+    Recomputes every rollup row from the source tables with grouped queries.
+    Returns the number of rows written. The caller is responsible for committing.
+    """
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    rows = {}
+
+    def day_of(column):
+        return func.date(column) if sqlite else cast(column, Date)
+
+    def add(employee_id, day, **values):
+        if employee_id is None or day is None:
+            return
+        key = (employee_id, _as_date(day))
+        row = rows.setdefault(key, _empty_row(*key))
+        for name, value in values.items():
+            row[name] += value or 0
+
+    review = models.PerformanceReview
+    day = day_of(review.created_at)
+    for employee_id, review_day, count, rated, total in db.execute(
+        select(review.employee_id, day, func.count(review.id), func.count(review.rating), func.sum(review.rating))
+        .group_by(review.employee_id, day)
+    ):
+        add(employee_id, review_day, review_count=count, rating_count=rated, rating_sum=total)
+
+    day = day_of(models.Feedback.created_at)
+    for to_user_id, feedback_day, count in db.execute(
+        select(models.Feedback.to_user_id, day, func.count(models.Feedback.id))
+        .group_by(models.Feedback.to_user_id, day)
+    ):
+        add(to_user_id, feedback_day, feedback_count=count)
+
+    result = models.KPIResult
+    day = day_of(result.created_at)
+    for employee_id, result_day, total, achieved in db.execute(
+        select(result.employee_id, day, func.count(result.id), func.sum(case((result.status == "Achieved", 1), else_=0)))
+        .group_by(result.employee_id, day)
+    ):
+        add(employee_id, result_day, kpi_total=total, kpi_achieved=achieved)
+
+    db.execute(delete(Rollup))
+    values = list(rows.values())
+    for start in range(0, len(values), INSERT_CHUNK_SIZE):
+        db.execute(insert(Rollup), values[start:start + INSERT_CHUNK_SIZE])
+    return len(values)
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """First day of the bucket containing ``day``; weeks start on Monday like date_trunc."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day
+
+
+def next_bucket(day: date, bucket: str) -> date:
+    if bucket == "day":
+        return day + timedelta(days=1)
+    if bucket == "week":
+        return day + timedelta(days=7)
+    month = day.month - 1 + (3 if bucket == "quarter" else 1)
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def buckets(start: date, end: date, bucket: str) -> list:
+    """Start days of all buckets overlapping [start, end]."""
+    days, day = [], bucket_start(start, bucket)
+    while day <= end:
+        days.append(day)
+        day = next_bucket(day, bucket)
+    return days
+
+
+def _bucket_column(bucket: str, dialect: str):
+    day = Rollup.day
+    if bucket == "day":
+        return day
+    if dialect != "sqlite":
+        return cast(func.date_trunc(bucket, day), Date)
+    if bucket == "week":
+        return func.date(day, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.date(day, "start of month")
+    months_into_quarter = (cast(func.strftime("%m", day), Integer) - 1) % 3
+    return func.date(day, "start of month", func.printf("-%d months", months_into_quarter))
+
+
+def series(db: Session, bucket: str, start: date, end: date, employee_filter=None) -> list:
+    """
+    Bucketed figures for the employees matched by ``employee_filter`` (a condition on
+    ``Rollup.employee_id``, or None for everyone), one point per bucket in [start, end]
+    including empty ones.
+    """
+    column = _bucket_column(bucket, db.get_bind().dialect.name).label("period")
+    query = (
+        select(column, *[func.sum(getattr(Rollup, name)) for name in COUNTERS])
+        .where(Rollup.day >= start, Rollup.day <= end)
+        .group_by(column)
+    )
+    if employee_filter is not None:
+        query = query.where(employee_filter)
+    totals = {_as_date(period): values for period, *values in db.execute(query)}
+
+    points = []
+    for period in buckets(start, end, bucket):
+        reviews, rated, rating_sum, feedback, kpi_total, kpi_achieved = totals.get(period, (0,) * len(COUNTERS))
+        points.append({
+            "period": period,
+            "review_count": reviews,
+            "average_rating": (rating_sum / rated) if rated else None,
+            "feedback_count": feedback,
+            "kpi_total": kpi_total,
+            "kpi_achievement_percent": (kpi_achieved / kpi_total * 100) if kpi_total else None,
+        })
+    return points
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        written = rebuild(db)
+        db.commit()
+        print(f"✓ Rebuilt {written} activity rollup rows")
+    finally:
+        db.close()
@@ -16,6 +16,11 @@ ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("ACCESS_TOKEN_EXPIRE_DAYS", "7"))
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * ACCESS_TOKEN_EXPIRE_DAYS
 
 
+def normalize_email(email: str) -> str:
+    """The stored form of an email address; lookups compare it with lower(email)."""
+    return email.strip().lower()
+
+
 def get_password_hash(password: str) -> str:
     """Hashes a plain-text password using the configured context."""
     return pwd_context.hash(password)
@@ -0,0 +1,185 @@
+"""
+Dashboard aggregation layer.
+
+Dashboards are served from the materialized rows in ``dashboard_summaries``
+(see ``app/summaries.py``), which makes them single primary-key reads. When a
+row has not been materialized yet, the figures are computed live with a single
+SELECT built from scalar subqueries, so counts, averages, the latest rating and
+the KPI achievement percentage are still evaluated by the database in one
+round-trip instead of loading rows into Python. The org dashboard sums the
+per-user rows of a manager's whole subtree, found through ``app/hierarchy.py``.
+"""
+from sqlalchemy import select, func, case, and_
+from sqlalchemy.orm import Session
+from . import models, summaries, hierarchy
+
+Summary = models.DashboardSummary
+
+
+def _from_summary(row: models.DashboardSummary) -> dict:
+    return {
+        "average_performance": (row.rating_sum / row.rating_count) if row.rating_count else 0,
+        "feedback_count": row.feedback_count,
+        "pending_feedback": row.pending_feedback_count,
+        "latest_rating": row.latest_rating,
+    }
+
+
+def _review_stats(employee_filter=None):
+    """Returns (average rating, latest rating) scalar subqueries for the given review filter."""
+    average = select(func.avg(models.PerformanceReview.rating))
+    latest = (
+        select(models.PerformanceReview.rating)
+        .order_by(models.PerformanceReview.created_at.desc(), models.PerformanceReview.id.desc())
+        .limit(1)
+    )
+    if employee_filter is not None:
+        average = average.where(employee_filter)
+        latest = latest.where(employee_filter)
+    return average.scalar_subquery(), latest.scalar_subquery()
+
+
+def _feedback_stats(recipient_filter=None):
+    """Returns (feedback count, pending feedback count) scalar subqueries for the given feedback filter."""
+    count = select(func.count(models.Feedback.id))
+    pending = select(func.count(models.Feedback.id)).where(models.Feedback.status == "pending")
+    if recipient_filter is not None:
+        count = count.where(recipient_filter)
+        pending = pending.where(recipient_filter)
+    return count.scalar_subquery(), pending.scalar_subquery()
+
+
+def admin_summary(db: Session) -> dict:
+    """Organisation-wide figures for the admin dashboard."""
+    row = summaries.get(db, summaries.GLOBAL)
+    if row is None:
+        return _aggregate_admin(db)
+    result = _from_summary(row)
+    result["total_employees"] = row.member_count
+    result["kpi_achievement_percent"] = (row.kpi_achieved / row.kpi_total * 100) if row.kpi_total else 0
+    return result
+
+
+def manager_summary(db: Session, manager_id: int) -> dict:
+    """Figures for the direct reports of the given manager."""
+    row = summaries.get(db, summaries.MANAGER, manager_id)
+    if row is None:
+        return _aggregate_manager(db, manager_id)
+    result = _from_summary(row)
+    result["team_size"] = row.member_count
+    return result
+
+
+def org_summary(db: Session, manager_id: int) -> dict:
+    """
+    Figures for everyone below the given manager, at any depth: the per-user
+    summary rows of the subtree summed in one query over the hierarchy index.
+    """
+    below = and_(hierarchy.Closure.ancestor_id == manager_id, hierarchy.Closure.depth > 0)
+    joined = and_(Summary.scope == summaries.USER, Summary.owner_id == hierarchy.Closure.descendant_id)
+    size, levels, review_total, rated, rating_sum, feedback_count, pending, kpi_total, kpi_achieved = db.execute(
+        select(
+            func.count(hierarchy.Closure.descendant_id),
+            func.coalesce(func.max(hierarchy.Closure.depth), 0),
+            *[func.coalesce(func.sum(getattr(Summary, name)), 0) for name in (
+                "review_count", "rating_count", "rating_sum", "feedback_count",
+                "pending_feedback_count", "kpi_total", "kpi_achieved",
+            )],
+        ).select_from(hierarchy.Closure).outerjoin(Summary, joined).where(below)
+    ).one()
+    latest = db.scalar(
+        select(Summary.latest_rating)
+        .select_from(hierarchy.Closure).join(Summary, joined)
+        .where(below, Summary.latest_review_at.isnot(None))
+        .order_by(Summary.latest_review_at.desc())
+        .limit(1)
+    )
+    return {
+        "manager_id": manager_id,
+        "org_size": size,
+        "levels": levels,
+        "average_performance": (rating_sum / rated) if rated else 0,
+        "feedback_count": feedback_count,
+        "pending_feedback": pending,
+        "latest_rating": latest,
+        "kpi_achievement_percent": (kpi_achieved / kpi_total * 100) if kpi_total else 0,
+    }
+
+
+def employee_summary(db: Session, user_id: int) -> dict:
+    """Figures for a single employee, excluding the review list."""
+    row = summaries.get(db, summaries.USER, user_id)
+    if row is None:
+        return _aggregate_employee(db, user_id)
+    return _from_summary(row)
+
+
+def employee_dashboard(db: Session, user_id: int) -> dict:
+    """Figures for a single employee together with their reviews."""
+    result = employee_summary(db, user_id)
+    result["reviews"] = db.query(models.PerformanceReview).filter(models.PerformanceReview.employee_id == user_id).all()
+    return result
+
+
+def _aggregate_admin(db: Session) -> dict:
+    """Aggregates organisation-wide figures for the admin dashboard."""
+    average, latest = _review_stats()
+    feedback_count, pending = _feedback_stats()
+    row = db.execute(
+        select(
+            select(func.count(models.User.id)).scalar_subquery(),
+            average,
+            feedback_count,
+            pending,
+            latest,
+            select(func.count(models.KPIResult.id)).scalar_subquery(),
+            select(func.coalesce(func.sum(case((models.KPIResult.status == "Achieved", 1), else_=0)), 0)).scalar_subquery(),
+        )
+    ).one()
+    total_employees, avg, feedback_count, pending, latest_rating, kpi_total, kpi_achieved = row
+    return {
+        "total_employees": total_employees,
+        "average_performance": avg or 0,
+        "feedback_count": feedback_count,
+        "pending_feedback": pending,
+        "latest_rating": latest_rating,
+        "kpi_achievement_percent": (kpi_achieved / kpi_total * 100) if kpi_total else 0,
+    }
+
+
+def _aggregate_manager(db: Session, manager_id: int) -> dict:
+    """Aggregates figures for the direct reports of the given manager."""
+    team_ids = select(models.User.id).where(models.User.manager_id == manager_id)
+    average, latest = _review_stats(models.PerformanceReview.employee_id.in_(team_ids))
+    feedback_count, pending = _feedback_stats(models.Feedback.to_user_id.in_(team_ids))
+    row = db.execute(
+        select(
+            select(func.count(models.User.id)).where(models.User.manager_id == manager_id).scalar_subquery(),
+            average,
+            feedback_count,
+            pending,
+            latest,
+        )
+    ).one()
+    team_size, avg, feedback_count, pending, latest_rating = row
+    return {
+        "team_size": team_size,
+        "average_performance": avg or 0,
+        "feedback_count": feedback_count,
+        "pending_feedback": pending,
+        "latest_rating": latest_rating,
+    }
+
+
+def _aggregate_employee(db: Session, user_id: int) -> dict:
+    """Aggregates figures for a single employee, excluding the review list."""
+    average, latest = _review_stats(models.PerformanceReview.employee_id == user_id)
+    feedback_count, pending = _feedback_stats(models.Feedback.to_user_id == user_id)
+    row = db.execute(select(average, feedback_count, pending, latest)).one()
+    avg, feedback_count, pending, latest_rating = row
+    return {
+        "average_performance": avg or 0,
+        "feedback_count": feedback_count,
+        "pending_feedback": pending,
+        "latest_rating": latest_rating,
+    }
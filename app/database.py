@@ -1,18 +1,55 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from starlette.concurrency import run_in_threadpool
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Connection pool settings (both database modes)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle connections older than this many seconds (-1 disables)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test connections on checkout so stale ones (e.g. after a Postgres restart) are replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Per-statement timeout in milliseconds (0 disables); PostgreSQL only
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+pool_options = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
 # Check if we should use SQLite (for quick testing) or PostgreSQL
 USE_SQLITE = os.getenv("USE_SQLITE", "false").lower() == "true"
+# Serve the async routes from an asyncio driver (asyncpg / aiosqlite) instead of
+# running the sync driver in the threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
 
 if USE_SQLITE:
     # SQLite for quick testing/development
     DB_FILE = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..", "employee.db")
     DB_URL = f"sqlite:///{DB_FILE}"
-    engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(DB_URL, connect_args={"check_same_thread": False}, **pool_options)
+
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a writer commits; NORMAL sync is safe with WAL.
+        # busy_timeout makes concurrent writers wait for the lock instead of failing at once.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA cache_size=-20000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 else:
     # PostgreSQL Configuration
     DB_URL = os.getenv("DATABASE_URL")
@@ -27,16 +64,112 @@ else:
         DB_NAME = os.getenv("DB_NAME", "epm_db")
         DB_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     
+    connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
     # Create engine
-    engine = create_engine(DB_URL)
+    engine = create_engine(DB_URL, connect_args=connect_args, **pool_options)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    if USE_SQLITE:
+        async_engine = create_async_engine(
+            DB_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+            poolclass=AsyncAdaptedQueuePool,
+            **pool_options,
+        )
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    else:
+        server_settings = {}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        async_engine = create_async_engine(
+            DB_URL.replace("postgresql://", "postgresql+asyncpg://", 1),
+            connect_args={"server_settings": server_settings},
+            **pool_options,
+        )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+class ThreadedAsyncSession:
+    """
+    Awaitable facade over a sync Session, used by the async routes when DB_ASYNC
+    is off. It offers the subset of the AsyncSession API the routes use, running
+    each call in the threadpool, so route code is the same in both modes.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+# Pool checkout statistics, updated by the pool event hooks below
+_pool_lock = threading.Lock()
+_pool_counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+
+
+def _count(name):
+    def _listener(*args):
+        with _pool_lock:
+            _pool_counters[name] += 1
+    return _listener
+
+
+event.listen(engine, "connect", _count("connects"))
+event.listen(engine, "checkout", _count("checkouts"))
+event.listen(engine, "checkin", _count("checkins"))
+event.listen(engine, "invalidate", _count("invalidations"))
+
+
+def pool_stats() -> dict:
+    """Returns the pool configuration, current usage and lifetime checkout counters."""
+    pool = engine.pool
+    with _pool_lock:
+        counters = dict(_pool_counters)
+    return {
+        "backend": engine.dialect.name,
+        "pool_class": type(pool).__name__,
+        "pool_size": pool.size() if hasattr(pool, "size") else None,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        "status": pool.status(),
+        "async_status": async_engine.pool.status() if async_engine is not None else None,
+        **counters,
+    }
+
+
 def init_db():
     """
-    Initializes the database by creating all tables defined in the models.
-    This function should be called at application startup.
+    Brings the schema up to date by applying the Alembic migrations.
+    Deploys run this once via `python -m app.migrate`; app startup only calls
+    it when AUTO_MIGRATE is enabled.
     """
-    from . import models
-    Base.metadata.create_all(bind=engine)
+    from .migrate import upgrade
+    upgrade()
@@ -1,36 +1,110 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from typing import List
-from .database import SessionLocal
+from typing import List, NamedTuple, Optional
+import os
+import time
+from .database import SessionLocal, AsyncSessionLocal, ThreadedAsyncSession
 from . import models
 from .auth import decode_access_token
+from .cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Authenticated principals are cached per process so that most requests need no
+# `users` query. Mutating user endpoints call invalidate_principal(); other
+# worker processes pick up changes once the TTL expires.
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+class Principal(NamedTuple):
+    """Immutable snapshot of the authenticated user's attributes."""
+    id: int
+    name: str
+    email: str
+    role: str
+    department: Optional[str]
+    manager_id: Optional[int]
+    is_active: bool
+
+
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+token_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drops a cached principal after the user was changed or deleted."""
+    principal_cache.pop(user_id)
+
 
 def get_db():
+    # Sessions connect lazily, so requests served from caches never check out a
+    # connection; an exception rolls back before the connection returns to the pool.
     db = SessionLocal()
     try:
         yield db
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db():
+    """
+    Async counterpart of get_db. Yields an AsyncSession when DB_ASYNC is enabled,
+    otherwise a ThreadedAsyncSession wrapping a regular sync session.
+    """
+    db = AsyncSessionLocal() if AsyncSessionLocal is not None else ThreadedAsyncSession(SessionLocal())
+    try:
+        yield db
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
+
+def _token_user_id(token: str) -> int:
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = decode_access_token(token)
-        user_id: int = int(payload.get("user_id"))
+        user_id = int(payload.get("user_id"))
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
-    return user
+    # Never cache a token beyond its own expiry
+    expires_at = None
+    if payload.get("exp") is not None:
+        expires_at = time.monotonic() + (payload["exp"] - time.time())
+    token_cache.set(token, user_id, expires_at=expires_at)
+    return user_id
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    user_id = _token_user_id(token)
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if not user or not user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
+        principal = Principal(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            role=user.role,
+            department=user.department,
+            manager_id=user.manager_id,
+            is_active=user.is_active,
+        )
+        principal_cache.set(user_id, principal)
+    return principal
 
 
 def require_roles(allowed: List[str]):
-    def _require(user: models.User = Depends(get_current_user)):
+    def _require(user: Principal = Depends(get_current_user)):
         if user.role not in allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
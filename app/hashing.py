@@ -0,0 +1,180 @@
+"""
+Bounded executor for password hashing and verification.
+
+argon2 is deliberately CPU-heavy. Running it inside request handlers ties up
+the threadpool that every other endpoint shares, so login storms starve the
+rest of the API. This module runs hashing on a dedicated process pool behind
+an async API with an admission limit: at most HASH_WORKERS jobs run at once,
+at most HASH_QUEUE_LIMIT more wait, and anything beyond that is rejected with
+HashingBusy so the caller can answer 503 instead of queueing without bound.
+Batches (user imports, seeding) use the same pool and the same limit, split
+into one job per worker.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from dotenv import load_dotenv
+from . import auth
+
+load_dotenv()
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 16)))
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_in_flight = 0
+# Guards _in_flight and _stats: batches are admitted from worker threads
+_lock = threading.Lock()
+_stats = {
+    "completed": 0,
+    "rejected": 0,
+    "failed": 0,
+    "latency_sum": 0.0,
+    "latency_max": 0.0,
+    "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn instead of fork: forking a multi-threaded server process is unsafe
+        _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _record_latency(seconds: float) -> None:
+    # Called with _lock held
+    _stats["completed"] += 1
+    _stats["latency_sum"] += seconds
+    _stats["latency_max"] = max(_stats["latency_max"], seconds)
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            _stats["latency_buckets"][i] += 1
+            break
+    else:
+        _stats["latency_buckets"][-1] += 1
+
+
+def _admit(jobs: int) -> None:
+    global _in_flight
+    with _lock:
+        if _in_flight + jobs > HASH_WORKERS + HASH_QUEUE_LIMIT:
+            _stats["rejected"] += jobs
+            raise HashingBusy("Password hashing queue is full")
+        _in_flight += jobs
+
+
+def _release(jobs: int, seconds: float, failed: bool) -> None:
+    """Ends ``jobs`` admitted jobs; ``seconds`` is the time each spent queued and running."""
+    global _in_flight
+    with _lock:
+        _in_flight -= jobs
+        if failed:
+            # Failed jobs are not completions and would skew the latency figures
+            _stats["failed"] += jobs
+        else:
+            for _ in range(jobs):
+                _record_latency(seconds)
+
+
+async def _submit(fn, *args):
+    _admit(1)
+    started = time.perf_counter()
+    failed = False
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _release(1, time.perf_counter() - started, failed)
+
+
+def _hash_all(passwords: List[str]) -> List[str]:
+    return [auth.get_password_hash(password) for password in passwords]
+
+
+async def hash_password(password: str) -> str:
+    """Hashes a plain-text password on the hashing pool."""
+    return await _submit(auth.get_password_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a plain-text password against a hash on the hashing pool."""
+    return await _submit(auth.verify_password, plain_password, hashed_password)
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    Hashes many plain-text passwords on the hashing pool, in order, blocking until done.
+    The batch is split into one job per worker, and the jobs count against the same
+    admission limit as single requests: raises HashingBusy if they do not fit.
+    For synchronous callers (threadpool routes, the seed CLI); never call it from a coroutine.
+    """
+    if not passwords:
+        return []
+    jobs = min(HASH_WORKERS, len(passwords))
+    size = -(-len(passwords) // jobs)
+    chunks = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+    _admit(len(chunks))
+    started = time.perf_counter()
+
+    def finished(future) -> None:
+        # Each job is released when it ends, with its own latency
+        _release(1, time.perf_counter() - started, future.cancelled() or future.exception() is not None)
+
+    futures = []
+    try:
+        for chunk in chunks:
+            future = _get_pool().submit(_hash_all, chunk)
+            futures.append(future)
+            future.add_done_callback(finished)
+    except Exception:
+        _release(len(chunks) - len(futures), time.perf_counter() - started, True)
+        raise
+    return [password_hash for future in futures for password_hash in future.result()]
+
+
+def stats() -> dict:
+    """Returns a snapshot of the executor's queue depth and latency metrics."""
+    completed = _stats["completed"]
+    cumulative, running = [], 0
+    for count in _stats["latency_buckets"]:
+        running += count
+        cumulative.append(running)
+    return {
+        "workers": HASH_WORKERS,
+        "queue_limit": HASH_QUEUE_LIMIT,
+        "in_flight": _in_flight,
+        "queue_depth": max(0, _in_flight - HASH_WORKERS),
+        "completed": completed,
+        "rejected": _stats["rejected"],
+        "failed": _stats["failed"],
+        "latency_avg_seconds": (_stats["latency_sum"] / completed) if completed else 0.0,
+        "latency_max_seconds": _stats["latency_max"],
+        "latency_buckets": {
+            **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS, cumulative)},
+            "le_inf": cumulative[-1],
+        },
+    }
+
+
+def shutdown() -> None:
+    """Stops the worker processes; called on application shutdown."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
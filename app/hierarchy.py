@@ -0,0 +1,167 @@
+"""
+Org hierarchy index.
+
+``org_hierarchy`` is a closure table: it holds a row for every (manager,
+report) pair at any depth, plus a depth-0 row for every user. "Is X in Y's
+org" becomes a primary-key lookup and a whole subtree is one indexed range
+scan, however deep the reporting lines go.
+
+The user endpoints keep it current inside their own transaction: creating a
+user copies the manager's ancestor rows, moving a user re-links the whole
+subtree with one DELETE and one INSERT ... SELECT, and deleting a user
+detaches their reports as subtrees of their own. ``rebuild`` recomputes the
+table from ``users.manager_id``; run it with ``python -m app.hierarchy``
+after bulk data changes.
+"""
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import Integer, select, delete, insert, func, literal, or_, true
+from sqlalchemy.orm import Session, aliased
+from . import models
+
+Closure = models.OrgHierarchy
+
+# Rows per INSERT statement and ids per IN (...) lookup
+CHUNK_SIZE = 5000
+# Bound on the recursion in rebuild, so a manager_id cycle cannot loop forever
+MAX_DEPTH = 256
+
+
+def _chunks(items: list):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def add_user(db: Session, user: models.User) -> None:
+    """Indexes a newly created (flushed) user."""
+    add_users(db, [(user.id, user.manager_id)])
+
+
+def add_users(db: Session, users: Iterable[Tuple[int, Optional[int]]]) -> None:
+    """
+    Indexes a batch of new users, given as (user_id, manager_id) tuples in which
+    managers from the same batch come before their reports. The ancestor rows of
+    the existing managers are loaded with one query per chunk.
+    """
+    users = list(users)
+    if not users:
+        return
+    new_ids = {user_id for user_id, _ in users}
+    external = list({manager_id for _, manager_id in users if manager_id and manager_id not in new_ids})
+
+    # user id -> [(ancestor_id, depth)], including the user itself at depth 0
+    chains = {}
+    for chunk in _chunks(external):
+        for ancestor_id, descendant_id, depth in db.execute(
+            select(Closure.ancestor_id, Closure.descendant_id, Closure.depth).where(Closure.descendant_id.in_(chunk))
+        ):
+            chains.setdefault(descendant_id, []).append((ancestor_id, depth))
+
+    rows = []
+    for user_id, manager_id in users:
+        chain = [(user_id, 0)]
+        if manager_id:
+            chain += [(ancestor_id, depth + 1) for ancestor_id, depth in chains.get(manager_id, ())]
+        chains[user_id] = chain
+        rows.extend({"ancestor_id": a, "descendant_id": user_id, "depth": d} for a, d in chain)
+    for chunk in _chunks(rows):
+        db.execute(insert(Closure), chunk)
+
+
+def _detach(db: Session, user_id: int) -> None:
+    """Unlinks the subtree rooted at ``user_id`` from all of the user's managers."""
+    subtree = select(Closure.descendant_id).where(Closure.ancestor_id == user_id)
+    above = select(Closure.ancestor_id).where(Closure.descendant_id == user_id, Closure.depth > 0)
+    db.execute(
+        delete(Closure).where(Closure.descendant_id.in_(subtree), Closure.ancestor_id.in_(above))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def move_user(db: Session, user_id: int, new_manager_id: Optional[int]) -> None:
+    """
+    Re-links a user and everyone below them under ``new_manager_id`` (None makes
+    the user a root). The caller must reject moves into the user's own org.
+    """
+    _detach(db, user_id)
+    if not new_manager_id:
+        return
+    above, below = aliased(Closure), aliased(Closure)
+    db.execute(
+        insert(Closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .select_from(above).join(below, true())
+            .where(above.descendant_id == new_manager_id, below.ancestor_id == user_id),
+        )
+    )
+
+
+def remove_user(db: Session, user_id: int) -> None:
+    """Drops a user that is about to be deleted; their reports become roots of their own subtrees."""
+    _detach(db, user_id)
+    db.execute(
+        delete(Closure).where(or_(Closure.ancestor_id == user_id, Closure.descendant_id == user_id))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def is_in_org(db: Session, user_id: int, manager_id: int) -> bool:
+    """True if ``user_id`` reports to ``manager_id`` directly or through any number of levels."""
+    return db.scalar(
+        select(Closure.depth).where(
+            Closure.ancestor_id == manager_id, Closure.descendant_id == user_id, Closure.depth > 0,
+        )
+    ) is not None
+
+
+def members_among(db: Session, manager_id: int, user_ids: Iterable[int]) -> set:
+    """Returns the ids among ``user_ids`` that are in ``manager_id``'s org, one query per chunk."""
+    found = set()
+    for chunk in _chunks(list(user_ids)):
+        found.update(db.scalars(
+            select(Closure.descendant_id).where(
+                Closure.ancestor_id == manager_id, Closure.descendant_id.in_(chunk), Closure.depth > 0,
+            )
+        ))
+    return found
+
+
+def org_ids(manager_id: int):
+    """SELECT of the ids of everyone below ``manager_id``, for use in IN (...) filters."""
+    return select(Closure.descendant_id).where(Closure.ancestor_id == manager_id, Closure.depth > 0)
+
+
+def rebuild(db: Session) -> int:
+    """
+    Recomputes the closure table from ``users.manager_id`` with one recursive
+    INSERT ... SELECT. Returns the number of rows written. The caller commits.
+    """
+    users = models.User.__table__
+    tree = select(
+        users.c.id.label("ancestor_id"), users.c.id.label("descendant_id"), literal(0, Integer).label("depth"),
+    ).cte("tree", recursive=True)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, users.c.id, tree.c.depth + 1)
+        .select_from(tree.join(users, users.c.manager_id == tree.c.descendant_id))
+        .where(tree.c.depth < MAX_DEPTH)
+    )
+    db.execute(delete(Closure))
+    db.execute(
+        insert(Closure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(tree.c.ancestor_id, tree.c.descendant_id, tree.c.depth),
+        )
+    )
+    return db.scalar(select(func.count()).select_from(Closure))
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        written = rebuild(db)
+        db.commit()
+        print(f"✓ Rebuilt {written} org hierarchy rows")
+    finally:
+        db.close()
@@ -0,0 +1,207 @@
+"""
+Response cache and conditional GET for the read-heavy endpoints.
+
+ResponseCacheMiddleware keeps the rendered JSON of the routes in CACHED_ROUTES,
+keyed by path, query string and either the caller's role (data every user of
+that role sees alike) or the caller's id (personal dashboards). Every response
+of those routes carries an ``ETag`` over its body, and requests with a matching
+``If-None-Match`` get a bodiless 304. A cache hit needs no database work at all.
+There is no ``Last-Modified``: the table versions below are per process and
+would miss writes made elsewhere, while a body hash cannot go stale.
+
+Invalidation is write-through: a Session hook records which tables a
+transaction wrote, and its commit bumps their versions, so entries that
+depend on those tables stop matching at once. Versions are per process, so
+other workers see a change within RESPONSE_CACHE_TTL seconds; the ETags are
+computed from the body and are therefore never stale.
+
+RESPONSE_CACHE_TTL=0 turns the server-side cache off but keeps the ETags.
+"""
+import hashlib
+import os
+import threading
+from typing import NamedTuple, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .cache import TTLCache
+from .dependencies import Principal, principal_cache, token_cache
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+
+_SUMMARY_SOURCES = ("dashboard_summaries", "users", "performance_reviews", "feedback", "kpi_results")
+
+
+class CachedRoute(NamedTuple):
+    path: str                 # route template; these routes have no path parameters
+    tables: Tuple[str, ...]   # tables the response is computed from
+    per_user: bool            # key by user id instead of role
+
+
+CACHED_ROUTES = {route.path: route for route in [
+    CachedRoute("/api/users", ("users", "org_hierarchy"), False),
+    CachedRoute("/api/users/", ("users", "org_hierarchy"), False),
+    CachedRoute("/api/kpi/", ("kpis",), False),
+    CachedRoute("/api/users/dashboard/admin", _SUMMARY_SOURCES, False),
+    CachedRoute("/api/users/dashboard/manager", _SUMMARY_SOURCES, True),
+    CachedRoute("/api/users/dashboard/employee", _SUMMARY_SOURCES, True),
+    CachedRoute("/api/users/dashboard/org", _SUMMARY_SOURCES + ("org_hierarchy",), True),
+]}
+
+# Scope state key naming the route of a response served here, for the metrics labels
+ROUTE_STATE_KEY = "cached_route"
+
+# Response headers that are recomputed or added by outer layers
+_SKIPPED_HEADERS = {b"content-length", b"etag", b"last-modified", b"cache-control", b"vary"}
+
+
+class _Entry(NamedTuple):
+    versions: tuple
+    headers: list
+    body: bytes
+    etag: str
+
+
+cache = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+not_modified = 0
+
+_lock = threading.Lock()
+# table -> number of committed writes
+_versions = {}
+
+
+def _snapshot(tables) -> tuple:
+    """Current versions of ``tables``."""
+    with _lock:
+        return tuple(_versions.get(name, 0) for name in tables)
+
+
+def invalidate(*tables: str) -> None:
+    """Marks cached responses computed from ``tables`` as stale."""
+    with _lock:
+        for name in tables:
+            _versions[name] = _versions.get(name, 0) + 1
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    written = session.info.setdefault("written_tables", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        written.add(obj.__table__.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_execute(state):
+    # Bulk INSERT/UPDATE/DELETE statements issued through session.execute()
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info.setdefault("written_tables", set()).add(state.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    written = session.info.pop("written_tables", None)
+    if written:
+        invalidate(*written)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _principal(scope) -> Optional[Principal]:
+    """The caller, if both their token and principal are already cached; never touches the database."""
+    authorization = _header(scope, b"authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    user_id = token_cache.get(token)
+    principal = principal_cache.get(user_id) if user_id is not None else None
+    return principal if principal is not None and principal.is_active else None
+
+
+def _is_fresh(scope, etag: str) -> bool:
+    if_none_match = _header(scope, b"if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+async def _respond(scope, send, entry: _Entry) -> None:
+    global not_modified
+    validators = [
+        (b"etag", entry.etag.encode()),
+        (b"cache-control", b"private, no-cache"),
+        (b"vary", b"Authorization"),
+    ]
+    if _is_fresh(scope, entry.etag):
+        not_modified += 1
+        await send({"type": "http.response.start", "status": 304, "headers": validators})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    headers = entry.headers + validators + [(b"content-length", str(len(entry.body)).encode())]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": entry.body})
+
+
+class ResponseCacheMiddleware:
+    """Pure ASGI middleware serving CACHED_ROUTES from the cache and answering conditional GETs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        route = CACHED_ROUTES.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        def key_for(principal: Principal):
+            return (scope["path"], scope["query_string"], principal.id if route.per_user else principal.role)
+
+        # Taken before the handler runs, so a write that commits meanwhile makes the entry stale
+        versions = _snapshot(route.tables)
+        principal = _principal(scope)
+        if principal is not None:
+            entry = cache.get(key_for(principal))
+            if entry is not None and entry.versions == versions:
+                # Answered before the router runs, so scope["route"] is never set
+                scope.setdefault("state", {})[ROUTE_STATE_KEY] = route.path
+                await _respond(scope, send, entry)
+                return
+
+        start = None
+        chunks = []
+
+        async def buffer(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                if start["status"] != 200:
+                    await send(message)
+            elif start["status"] != 200:
+                await send(message)
+            else:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body = b"".join(chunks)
+                    entry = _Entry(
+                        versions=versions,
+                        headers=[(k, v) for k, v in start.get("headers", []) if k.lower() not in _SKIPPED_HEADERS],
+                        body=body,
+                        etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+                    )
+                    # The handler authenticated the caller, so their principal is cached now
+                    cached_principal = _principal(scope)
+                    if cached_principal is not None:
+                        cache.set(key_for(cached_principal), entry)
+                    await _respond(scope, send, entry)
+
+        await self.app(scope, receive, buffer)
+
+
+def stats() -> dict:
+    return {"entries": len(cache), "hits": cache.hits, "misses": cache.misses, "not_modified": not_modified}
@@ -0,0 +1,252 @@
+"""
+KPI leaderboards and percentile ranks.
+
+``kpi_standings`` holds every employee's latest score on each KPI, and
+``kpi_totals`` the sum of those scores per employee with their department
+copied in. The KPI evaluation endpoints update both in their own transaction:
+the new scores overwrite the standings, and only the affected employees'
+totals are recomputed from their handful of standing rows. Queries never
+touch ``kpi_results``.
+
+A top-N list is an ORDER BY ... LIMIT N walk of the (kpi_id, score) or
+(department, total_score) index. A rank or percentile is a count over one
+range of the same index. ``rebuild`` recomputes both tables from the latest
+result per KPI and employee; run it with ``python -m app.leaderboard`` after
+bulk data changes.
+"""
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import select, insert, update, delete, func, case, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+
+Standing = models.KPIStanding
+Total = models.KPITotal
+
+# Upper bound on the length of a leaderboard
+MAX_TOP = 100
+
+
+def _insert_missing(db: Session, model, rows: list) -> None:
+    """Inserts rows whose key another request may be inserting concurrently; those are skipped."""
+    if not rows:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(model), rows)
+    except IntegrityError:
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(model).values(**row))
+            except IntegrityError:
+                pass
+
+
+def record_result(db: Session, result: models.KPIResult) -> None:
+    """Makes a newly created KPI result the employee's standing on that KPI."""
+    record_results(db, [(result.kpi_id, result.employee_id, result.score)])
+
+
+def record_results(db: Session, results: Iterable[Tuple[int, int, Optional[float]]]) -> None:
+    """
+    Applies a batch of new KPI results, given as (kpi_id, employee_id, score) tuples
+    in creation order, so the last result per KPI and employee wins.
+    """
+    latest = {}
+    for kpi_id, employee_id, score in results:
+        latest[(kpi_id, employee_id)] = score or 0.0
+    if not latest:
+        return
+
+    existing = set()
+    for kpi_id in {kpi_id for kpi_id, _ in latest}:
+        employee_ids = [employee_id for k, employee_id in latest if k == kpi_id]
+        existing.update(db.execute(
+            select(Standing.kpi_id, Standing.employee_id)
+            .where(Standing.kpi_id == kpi_id, Standing.employee_id.in_(employee_ids))
+        ).tuples())
+    _insert_missing(db, Standing, [
+        {"kpi_id": kpi_id, "employee_id": employee_id, "score": 0.0}
+        for kpi_id, employee_id in latest if (kpi_id, employee_id) not in existing
+    ])
+    table = Standing.__table__
+    db.execute(
+        update(table)
+        .where(table.c.kpi_id == bindparam("key_kpi"), table.c.employee_id == bindparam("key_employee"))
+        .values(score=bindparam("new_score")),
+        [
+            {"key_kpi": kpi_id, "key_employee": employee_id, "new_score": score}
+            for (kpi_id, employee_id), score in latest.items()
+        ],
+    )
+
+    employee_ids = list({employee_id for _, employee_id in latest})
+    present = set(db.scalars(select(Total.employee_id).where(Total.employee_id.in_(employee_ids))))
+    _insert_missing(db, Total, [
+        {"employee_id": employee_id, "department": None, "total_score": 0.0, "kpi_count": 0}
+        for employee_id in employee_ids if employee_id not in present
+    ])
+    refresh_totals(db, employee_ids)
+
+
+def refresh_totals(db: Session, employee_ids: Iterable[int]) -> None:
+    """Recomputes the totals rows of the given employees from their standings and current department."""
+    employee_ids = list(employee_ids)
+    if not employee_ids:
+        return
+    own = Standing.employee_id == Total.employee_id
+    db.execute(
+        update(Total)
+        .where(Total.employee_id.in_(employee_ids))
+        .values(
+            total_score=select(func.coalesce(func.sum(Standing.score), 0.0)).where(own).scalar_subquery(),
+            kpi_count=select(func.count()).select_from(Standing).where(own).scalar_subquery(),
+            department=select(models.User.department).where(models.User.id == Total.employee_id).scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def forget_user(db: Session, user_id: int) -> None:
+    """Removes a user that is about to be deleted from the leaderboards."""
+    db.execute(delete(Standing).where(Standing.employee_id == user_id))
+    db.execute(delete(Total).where(Total.employee_id == user_id))
+
+
+def rebuild(db: Session) -> int:
+    """
+    Recomputes both tables from the latest result per KPI and existing employee.
+    Returns the number of standings written. The caller is responsible for committing.
+    """
+    result = models.KPIResult
+    latest = (
+        select(func.max(result.id).label("id"))
+        .where(result.kpi_id.isnot(None), result.employee_id.isnot(None))
+        .group_by(result.kpi_id, result.employee_id)
+        .subquery()
+    )
+    db.execute(delete(Total))
+    db.execute(delete(Standing))
+    db.execute(insert(Standing).from_select(
+        ["kpi_id", "employee_id", "score"],
+        select(result.kpi_id, result.employee_id, func.coalesce(result.score, 0.0))
+        .join(latest, latest.c.id == result.id)
+        .join(models.User, models.User.id == result.employee_id),
+    ))
+    db.execute(insert(Total).from_select(
+        ["employee_id", "department", "total_score", "kpi_count"],
+        select(Standing.employee_id, models.User.department, func.sum(Standing.score), func.count())
+        .join(models.User, models.User.id == Standing.employee_id)
+        .group_by(Standing.employee_id, models.User.department),
+    ))
+    return db.scalar(select(func.count()).select_from(Standing))
+
+
+def _ranked(rows: list) -> list:
+    """Adds competition ranks (1, 2, 2, 4) to rows ordered by score, best first."""
+    entries, rank, previous = [], 0, None
+    for position, (employee_id, name, department, score) in enumerate(rows, start=1):
+        if score != previous:
+            rank, previous = position, score
+        entries.append({"rank": rank, "employee_id": employee_id, "name": name, "department": department, "score": score})
+    return entries
+
+
+def top_for_kpi(db: Session, kpi_id: int, limit: int, department: Optional[str] = None) -> dict:
+    """The ``limit`` best latest scores on a KPI, optionally among one department."""
+    user = models.User
+    query = (
+        select(Standing.employee_id, user.name, user.department, Standing.score)
+        .join(user, user.id == Standing.employee_id)
+        .where(Standing.kpi_id == kpi_id)
+    )
+    total = select(func.count()).select_from(Standing).where(Standing.kpi_id == kpi_id)
+    if department is not None:
+        query = query.where(user.department == department)
+        total = total.join(user, user.id == Standing.employee_id).where(user.department == department)
+    rows = db.execute(query.order_by(Standing.score.desc(), Standing.employee_id).limit(limit)).all()
+    return {"total": db.scalar(total), "entries": _ranked(rows)}
+
+
+def top_by_total(db: Session, limit: int, department: Optional[str] = None) -> dict:
+    """The ``limit`` best total scores, company-wide or in one department."""
+    user = models.User
+    query = select(Total.employee_id, user.name, Total.department, Total.total_score).join(user, user.id == Total.employee_id)
+    total = select(func.count()).select_from(Total)
+    if department is not None:
+        query = query.where(Total.department == department)
+        total = total.where(Total.department == department)
+    rows = db.execute(query.order_by(Total.total_score.desc(), Total.employee_id).limit(limit)).all()
+    return {"total": db.scalar(total), "entries": _ranked(rows)}
+
+
+def percentile(lower: int, size: int) -> float:
+    """Share of the other ``size - 1`` entries that score lower, in percent; 100 when alone."""
+    return 100.0 if size <= 1 else lower / (size - 1) * 100
+
+
+def standing(db: Session, employee: models.User) -> dict:
+    """An employee's total with their rank and percentile in their department, and the same per KPI."""
+    peer = Standing.__table__.alias("peer")
+    same_kpi = peer.c.kpi_id == Standing.kpi_id
+    kpis = db.execute(
+        select(
+            Standing.kpi_id,
+            models.KPI.title,
+            Standing.score,
+            select(func.count()).select_from(peer).where(same_kpi, peer.c.score > Standing.score).scalar_subquery(),
+            select(func.count()).select_from(peer).where(same_kpi, peer.c.score < Standing.score).scalar_subquery(),
+            select(func.count()).select_from(peer).where(same_kpi).scalar_subquery(),
+        )
+        .join(models.KPI, models.KPI.id == Standing.kpi_id)
+        .where(Standing.employee_id == employee.id)
+        .order_by(Standing.kpi_id)
+    ).all()
+
+    totals = db.get(Total, employee.id)
+    department = {"department_rank": None, "department_percentile": None, "department_size": 0}
+    if totals is not None:
+        in_department = Total.department.is_(None) if totals.department is None else Total.department == totals.department
+        higher, lower, size = db.execute(
+            select(
+                func.coalesce(func.sum(case((Total.total_score > totals.total_score, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Total.total_score < totals.total_score, 1), else_=0)), 0),
+                func.count(),
+            ).where(in_department)
+        ).one()
+        department = {
+            "department_rank": higher + 1,
+            "department_percentile": percentile(lower, size),
+            "department_size": size,
+        }
+    return {
+        "employee_id": employee.id,
+        "department": employee.department,
+        "total_score": totals.total_score if totals is not None else 0.0,
+        "kpi_count": totals.kpi_count if totals is not None else 0,
+        **department,
+        "kpis": [
+            {
+                "kpi_id": kpi_id,
+                "title": title,
+                "score": score,
+                "rank": higher + 1,
+                "percentile": percentile(lower, size),
+                "total": size,
+            }
+            for kpi_id, title, score, higher, lower, size in kpis
+        ],
+    }
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        written = rebuild(db)
+        db.commit()
+        print(f"✓ Rebuilt {written} KPI standings")
+    finally:
+        db.close()
@@ -0,0 +1,300 @@
+"""
+Request and database metrics.
+
+MetricsMiddleware records per-route latency histograms, request and error
+counts and the number of in-flight requests. The SQLAlchemy cursor hooks
+below count the queries and database time of the request being served; both
+are reported in a ``Server-Timing`` response header and aggregated per route.
+Everything is exposed in Prometheus text format at ``GET /metrics``.
+
+Set METRICS_TOKEN to require ``Authorization: Bearer <token>`` on /metrics,
+and SERVER_TIMING=false to omit the response header.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from . import database, hashing, http_cache, moderation_queue, near_duplicates, querylog
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() == "true"
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimings:
+    """Database work of a single request, filled in by the cursor hooks."""
+    __slots__ = ("scope", "queries", "db_seconds", "statements")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        # normalized statement -> [executions, seconds]; only filled when SQL_INSPECT is on
+        self.statements = {}
+
+    def label(self) -> str:
+        return f"{self.scope['method']} {_route_label(self.scope)}"
+
+
+# The object is shared with the threadpool copies of the request context, so
+# queries run by sync handlers are counted against the request too.
+current_request: ContextVar[Optional[RequestTimings]] = ContextVar("current_request", default=None)
+
+
+class _RouteStats:
+    __slots__ = ("count", "errors", "seconds", "buckets", "statuses", "queries", "db_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_lock = threading.Lock()
+_routes = {}
+_in_flight = 0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    timings = current_request.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.db_seconds += seconds
+    if querylog.ENABLED:
+        querylog.observe(timings, statement, seconds)
+
+
+def _handle_error(exception_context):
+    # Keep the start-time stack balanced when a statement fails
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def instrument(engine) -> None:
+    """Installs the query counting hooks on a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+instrument(database.engine)
+if database.async_engine is not None:
+    instrument(database.async_engine.sync_engine)
+
+
+def _route_label(scope) -> str:
+    # Route templates, not raw paths, so ids don't blow up the label cardinality
+    route = scope.get("route")
+    # Cache hits are answered before routing; the response cache names their route
+    cached = scope.get("state", {}).get(http_cache.ROUTE_STATE_KEY)
+    return getattr(route, "path", None) or cached or "<unmatched>"
+
+
+def _record(method: str, route: str, status: int, seconds: float, timings: RequestTimings) -> None:
+    with _lock:
+        stats = _routes.get((method, route))
+        if stats is None:
+            stats = _routes[(method, route)] = _RouteStats()
+        stats.count += 1
+        stats.seconds += seconds
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        if status >= 500:
+            stats.errors += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                stats.buckets[i] += 1
+                break
+        else:
+            stats.buckets[-1] += 1
+        stats.queries += timings.queries
+        stats.db_seconds += timings.db_seconds
+
+
+def server_timing(total_seconds: float, timings: RequestTimings) -> str:
+    return (
+        f'app;dur={total_seconds * 1000:.1f}, '
+        f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.queries} queries"'
+    )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed to their last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(scope)
+        token = current_request.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    header = server_timing(time.perf_counter() - started, timings)
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        with _lock:
+            _in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            with _lock:
+                _in_flight -= 1
+            current_request.reset(token)
+            _record(scope["method"], _route_label(scope), status, time.perf_counter() - started, timings)
+            if querylog.ENABLED:
+                querylog.finish(timings)
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render() -> str:
+    """Renders all metrics in the Prometheus text exposition format."""
+    with _lock:
+        routes = {key: (s.count, s.errors, s.seconds, list(s.buckets), dict(s.statuses), s.queries, s.db_seconds)
+                  for key, s in _routes.items()}
+        in_flight = _in_flight
+
+    lines = [
+        "# HELP http_requests_in_flight Requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {in_flight}",
+        "# HELP http_requests_total Requests by route and status code.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route), (_, _, _, _, statuses, _, _) in sorted(routes.items()):
+        for status, count in sorted(statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += ["# HELP http_request_errors_total Requests that failed with a 5xx status.",
+              "# TYPE http_request_errors_total counter"]
+    for (method, route), (_, errors, _, _, _, _, _) in sorted(routes.items()):
+        lines.append(f"http_request_errors_total{_labels(method=method, route=route)} {errors}")
+
+    lines += ["# HELP http_request_duration_seconds Request latency by route.",
+              "# TYPE http_request_duration_seconds histogram"]
+    for (method, route), (count, _, seconds, buckets, _, _, _) in sorted(routes.items()):
+        cumulative = 0
+        for bound, bucket in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += bucket
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {seconds}")
+        lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {count}")
+
+    lines += ["# HELP db_queries_total SQL statements executed, by route.",
+              "# TYPE db_queries_total counter"]
+    for (method, route), (_, _, _, _, _, queries, _) in sorted(routes.items()):
+        lines.append(f"db_queries_total{_labels(method=method, route=route)} {queries}")
+    lines += ["# HELP db_query_seconds_total Time spent executing SQL statements, by route.",
+              "# TYPE db_query_seconds_total counter"]
+    for (method, route), (_, _, _, _, _, _, db_seconds) in sorted(routes.items()):
+        lines.append(f"db_query_seconds_total{_labels(method=method, route=route)} {db_seconds}")
+
+    if querylog.ENABLED:
+        inspected = querylog.stats()
+        lines += ["# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS, by route.",
+                  "# TYPE db_slow_queries_total counter"]
+        for route, count in sorted(inspected["slow_queries"].items()):
+            lines.append(f"db_slow_queries_total{_labels(route=route)} {count}")
+        lines += ["# HELP db_n_plus_one_total Requests that repeated a statement N_PLUS_ONE_THRESHOLD times or more.",
+                  "# TYPE db_n_plus_one_total counter"]
+        for route, count in sorted(inspected["n_plus_one"].items()):
+            lines.append(f"db_n_plus_one_total{_labels(route=route)} {count}")
+
+    pool = database.pool_stats()
+    lines += ["# HELP db_pool_connections Connection pool usage.", "# TYPE db_pool_connections gauge"]
+    for state in ("checked_out", "checked_in", "overflow"):
+        if pool[state] is not None:
+            lines.append(f"db_pool_connections{_labels(state=state)} {pool[state]}")
+    lines += ["# HELP db_pool_events_total Connection pool events.", "# TYPE db_pool_events_total counter"]
+    for name in ("connects", "checkouts", "checkins", "invalidations"):
+        lines.append(f"db_pool_events_total{_labels(event=name)} {pool[name]}")
+
+    hashing_stats = hashing.stats()
+    lines += [
+        "# HELP password_hashing_in_flight Password hashing jobs running or queued.",
+        "# TYPE password_hashing_in_flight gauge",
+        f"password_hashing_in_flight {hashing_stats['in_flight']}",
+        "# HELP password_hashing_total Password hashing jobs by outcome.",
+        "# TYPE password_hashing_total counter",
+    ]
+    for outcome in ("completed", "rejected", "failed"):
+        lines.append(f"password_hashing_total{_labels(outcome=outcome)} {hashing_stats[outcome]}")
+
+    cache_stats = http_cache.stats()
+    lines += [
+        "# HELP response_cache_entries Responses held by the response cache.",
+        "# TYPE response_cache_entries gauge",
+        f"response_cache_entries {cache_stats['entries']}",
+        "# HELP response_not_modified_total Conditional GETs answered with 304 Not Modified.",
+        "# TYPE response_not_modified_total counter",
+        f"response_not_modified_total {cache_stats['not_modified']}",
+        "# HELP response_cache_lookups_total Response cache lookups by outcome.",
+        "# TYPE response_cache_lookups_total counter",
+    ]
+    for outcome in ("hits", "misses"):
+        lines.append(f"response_cache_lookups_total{_labels(outcome=outcome)} {cache_stats[outcome]}")
+
+    queue_stats = moderation_queue.stats()
+    lines += [
+        "# HELP feedback_moderation_queue_depth Feedback entries waiting to be scored.",
+        "# TYPE feedback_moderation_queue_depth gauge",
+        f"feedback_moderation_queue_depth {queue_stats['queue_depth']}",
+        "# HELP feedback_moderation_total Moderated feedback entries by outcome.",
+        "# TYPE feedback_moderation_total counter",
+    ]
+    for outcome in ("approved", "flagged", "failed"):
+        lines.append(f"feedback_moderation_total{_labels(outcome=outcome)} {queue_stats[outcome]}")
+
+    duplicate_stats = near_duplicates.stats()
+    lines += [
+        "# HELP feedback_near_duplicate_index_entries Recent feedback messages in the near-duplicate index.",
+        "# TYPE feedback_near_duplicate_index_entries gauge",
+        f"feedback_near_duplicate_index_entries {duplicate_stats['entries']}",
+        "# HELP feedback_near_duplicate_lookups_total Near-duplicate lookups on submission by outcome.",
+        "# TYPE feedback_near_duplicate_lookups_total counter",
+        f"feedback_near_duplicate_lookups_total{_labels(outcome='hit')} {duplicate_stats['hits']}",
+        f"feedback_near_duplicate_lookups_total{_labels(outcome='miss')} {duplicate_stats['lookups'] - duplicate_stats['hits']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,69 @@
+"""
+Schema migrations (Alembic, scripts in migrations/).
+
+Run once per deploy, before the app workers start:
+
+    python -m app.migrate                 # upgrade to the latest revision
+    python -m app.migrate current         # show the applied revision
+    python -m app.migrate downgrade 0002  # roll back to a revision
+
+Databases created by the old create_all startup have tables but no
+alembic_version; they are stamped at the baseline revision first and then
+upgraded, so existing deployments pick up the new revisions.
+"""
+import argparse
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from .database import engine
+
+ROOT = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..")
+BASELINE = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    return config
+
+
+def _adopt_legacy_schema(config: Config) -> None:
+    """Stamps databases created by create_all at the baseline revision."""
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE)
+        print(f"✓ Stamped existing schema at revision {BASELINE}")
+
+
+def upgrade(revision: str = "head") -> None:
+    config = alembic_config()
+    _adopt_legacy_schema(config)
+    command.upgrade(config, revision)
+    print(f"✓ Database schema upgraded to {revision}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    sub = parser.add_subparsers(dest="command")
+    up = sub.add_parser("upgrade", help="Upgrade to a revision (default: head)")
+    up.add_argument("revision", nargs="?", default="head")
+    down = sub.add_parser("downgrade", help="Downgrade to a revision")
+    down.add_argument("revision")
+    sub.add_parser("current", help="Show the current revision")
+    sub.add_parser("history", help="List the revisions")
+    args = parser.parse_args()
+
+    config = alembic_config()
+    if args.command == "downgrade":
+        command.downgrade(config, args.revision)
+    elif args.command == "current":
+        command.current(config)
+    elif args.command == "history":
+        command.history(config)
+    else:
+        upgrade(getattr(args, "revision", "head"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Float, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
 
+# Secondary indexes follow the route queries: equality filters first, then the
+# (created_at, id) keyset used by pagination and the exports.
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_manager_id", "manager_id"),
+        Index("ix_users_name", "name"),
+        Index("ix_users_department_role", "department", "role"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -29,6 +37,11 @@ class User(Base):
 
 class PerformanceReview(Base):
     __tablename__ = "performance_reviews"
+    __table_args__ = (
+        Index("ix_performance_reviews_employee_created", "employee_id", "created_at", "id", postgresql_include=["rating"]),
+        Index("ix_performance_reviews_manager_created", "manager_id", "created_at", "id"),
+        Index("ix_performance_reviews_created", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("users.id"))
     manager_id = Column(Integer, ForeignKey("users.id"))
@@ -42,6 +55,11 @@ class PerformanceReview(Base):
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_to_user_created", "to_user_id", "created_at", "id", postgresql_include=["status"]),
+        Index("ix_feedback_status_created", "status", "created_at", "id"),
+        Index("ix_feedback_created", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     from_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     to_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -49,6 +67,10 @@ class Feedback(Base):
     is_anonymous = Column(Boolean, default=False)
     status = Column(String, default="pending")
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set by the moderation queue (app/moderation_queue.py); NULL while queued
+    moderation_score = Column(Float, nullable=True)
+    moderation_flags = Column(String, nullable=True)
+    moderated_at = Column(DateTime, nullable=True)
 
 
 class Approval(Base):
@@ -72,6 +94,12 @@ class KPI(Base):
 
 class KPIResult(Base):
     __tablename__ = "kpi_results"
+    __table_args__ = (
+        Index("ix_kpi_results_kpi_employee", "kpi_id", "employee_id"),
+        Index("ix_kpi_results_employee_status", "employee_id", "status"),
+        Index("ix_kpi_results_status", "status"),
+        Index("ix_kpi_results_created", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     kpi_id = Column(Integer, ForeignKey("kpis.id"))
     employee_id = Column(Integer, ForeignKey("users.id"))
@@ -82,3 +110,90 @@ class KPIResult(Base):
 
     employee = relationship("User", back_populates="kpi_results")
     kpi = relationship("KPI")
+
+
+class DashboardSummary(Base):
+    """
+    Pre-aggregated dashboard figures, maintained incrementally by the write endpoints.
+    scope is "global" (owner_id 0), "user" (owner_id = user id) or "manager"
+    (owner_id = manager id, covering the manager's direct reports).
+    """
+    __tablename__ = "dashboard_summaries"
+    __table_args__ = (UniqueConstraint("scope", "owner_id", name="uq_dashboard_summaries_scope_owner"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)
+    owner_id = Column(Integer, nullable=False, default=0)
+    member_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    latest_rating = Column(Float, nullable=True)
+    latest_review_at = Column(DateTime, nullable=True)
+    feedback_count = Column(Integer, nullable=False, default=0)
+    pending_feedback_count = Column(Integer, nullable=False, default=0)
+    kpi_total = Column(Integer, nullable=False, default=0)
+    kpi_achieved = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class OrgHierarchy(Base):
+    """
+    Closure table of the reporting lines: one row per (manager, report) pair at
+    any depth, plus a depth-0 row per user. Maintained by ``app/hierarchy.py``.
+    """
+    __tablename__ = "org_hierarchy"
+    __table_args__ = (Index("ix_org_hierarchy_descendant", "descendant_id", "depth"),)
+
+    ancestor_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+
+class ActivityRollup(Base):
+    """
+    Per-employee, per-day (UTC) counts behind the analytics time series,
+    maintained incrementally by ``app/analytics.py``. Like the dashboard
+    summaries, rows outlive the user they belong to, as do the source rows.
+    """
+    __tablename__ = "activity_rollups"
+    __table_args__ = (Index("ix_activity_rollups_day", "day"),)
+
+    employee_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    feedback_count = Column(Integer, nullable=False, default=0)
+    kpi_total = Column(Integer, nullable=False, default=0)
+    kpi_achieved = Column(Integer, nullable=False, default=0)
+
+
+class KPIStanding(Base):
+    """
+    Latest score of each employee on each KPI, maintained by ``app/leaderboard.py``.
+    Ordered by (kpi_id, score) for the per-KPI leaderboards and percentiles.
+    """
+    __tablename__ = "kpi_standings"
+    __table_args__ = (Index("ix_kpi_standings_kpi_score", "kpi_id", "score"),)
+
+    kpi_id = Column(Integer, primary_key=True)
+    employee_id = Column(Integer, primary_key=True)
+    score = Column(Float, nullable=False, default=0.0)
+
+
+class KPITotal(Base):
+    """
+    Sum of each employee's latest KPI scores, with their department copied in so
+    department leaderboards are a single index range. Maintained by ``app/leaderboard.py``.
+    """
+    __tablename__ = "kpi_totals"
+    __table_args__ = (
+        Index("ix_kpi_totals_department_score", "department", "total_score"),
+        Index("ix_kpi_totals_score", "total_score"),
+    )
+
+    employee_id = Column(Integer, primary_key=True)
+    department = Column(String, nullable=True)
+    total_score = Column(Float, nullable=False, default=0.0)
+    kpi_count = Column(Integer, nullable=False, default=0)
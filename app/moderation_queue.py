@@ -0,0 +1,271 @@
+"""
+Background moderation of submitted feedback.
+
+``post_feedback`` commits the new entry as ``pending`` and enqueues its id. A
+pool of MODERATION_WORKERS threads drains the queue in batches of up to
+MODERATION_BATCH_SIZE ids. Each batch is scored and written back in one
+transaction:
+
+- ``abusive``: contains a blocked term (the list may have changed since submission)
+- ``duplicate``: nearly the same text as earlier feedback to the same recipient
+  (see app/near_duplicates.py)
+- ``too_short`` / ``too_long`` / ``shouting``: length and capitalisation heuristics
+
+The weights of the flags add up to ``moderation_score``. Entries scoring below
+MODERATION_FLAG_THRESHOLD are approved automatically (unless
+MODERATION_AUTO_APPROVE=false); the rest stay ``pending`` for a manager, with
+their flags recorded. ``moderated_at`` stays NULL until an entry was scored,
+so the table itself is the durable queue. Unscored entries are re-enqueued at
+startup and by an idle worker every MODERATION_SWEEP_SECONDS, and
+``python -m app.moderation_queue`` scores them all synchronously (for
+MODERATION_WORKERS=0 deployments).
+"""
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.orm import Session
+from . import models, moderation, near_duplicates, summaries
+
+MODERATION_WORKERS = int(os.getenv("MODERATION_WORKERS", "2"))
+MODERATION_BATCH_SIZE = int(os.getenv("MODERATION_BATCH_SIZE", "100"))
+MODERATION_FLAG_THRESHOLD = float(os.getenv("MODERATION_FLAG_THRESHOLD", "0.5"))
+MODERATION_AUTO_APPROVE = os.getenv("MODERATION_AUTO_APPROVE", "true").lower() == "true"
+MODERATION_SWEEP_SECONDS = float(os.getenv("MODERATION_SWEEP_SECONDS", "60"))
+
+# Score contributed by each flag
+WEIGHTS = {
+    "abusive": 1.0,
+    "duplicate": 0.6,
+    "too_short": 0.3,
+    "too_long": 0.3,
+    "shouting": 0.3,
+}
+MIN_MESSAGE_LENGTH = 15
+MAX_MESSAGE_LENGTH = 5000
+# Share of upper-case letters above which a message counts as shouting
+SHOUTING_RATIO = 0.7
+
+Feedback = models.Feedback
+
+_queue: "queue.Queue[Optional[int]]" = queue.Queue()
+_workers: List[threading.Thread] = []
+_workers_lock = threading.Lock()
+_sweep_lock = threading.Lock()
+_stats = {"enqueued": 0, "scored": 0, "approved": 0, "flagged": 0, "failed": 0}
+
+
+def _content_flags(message: str) -> list:
+    flags = []
+    if moderation.is_abusive(message):
+        flags.append("abusive")
+    text = message.strip()
+    if len(text) < MIN_MESSAGE_LENGTH:
+        flags.append("too_short")
+    elif len(text) > MAX_MESSAGE_LENGTH:
+        flags.append("too_long")
+    letters = [ch for ch in text if ch.isalpha()]
+    if len(letters) >= MIN_MESSAGE_LENGTH and sum(ch.isupper() for ch in letters) / len(letters) > SHOUTING_RATIO:
+        flags.append("shouting")
+    return flags
+
+
+def _duplicate_ids(db: Session, items: list) -> set:
+    """Ids of the items that nearly repeat earlier feedback to the same recipient."""
+    index = near_duplicates.index()
+    index.sync(db)
+    return {item.id for item in items if index.find(item.to_user_id, item.message, before_id=item.id) is not None}
+
+
+def score(db: Session, items: list) -> dict:
+    """{feedback id: (score, flags)} for rows with ``id``, ``to_user_id`` and ``message``."""
+    duplicates = _duplicate_ids(db, items)
+    results = {}
+    for item in items:
+        flags = _content_flags(item.message) + (["duplicate"] if item.id in duplicates else [])
+        results[item.id] = (min(1.0, sum(WEIGHTS[flag] for flag in flags)), flags)
+    return results
+
+
+def process(db: Session, ids: Iterable[int]) -> dict:
+    """
+    Scores the not yet moderated entries among ``ids`` and auto-approves the clean ones.
+    Returns the counts of scored, approved and flagged entries. The caller commits.
+    """
+    items = db.execute(
+        select(Feedback.id, Feedback.to_user_id, Feedback.message)
+        .where(Feedback.id.in_(list(ids)), Feedback.moderated_at.is_(None))
+    ).all()
+    if not items:
+        return {"scored": 0, "approved": 0, "flagged": 0}
+    results = score(db, items)
+    table = Feedback.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("key_id"), table.c.moderated_at.is_(None))
+        .values(moderation_score=bindparam("score"), moderation_flags=bindparam("flags"), moderated_at=datetime.utcnow()),
+        [
+            {"key_id": feedback_id, "score": value, "flags": ",".join(flags) or None}
+            for feedback_id, (value, flags) in results.items()
+        ],
+    )
+    clean = [feedback_id for feedback_id, (value, _) in results.items() if value < MODERATION_FLAG_THRESHOLD]
+    approved = []
+    if MODERATION_AUTO_APPROVE and clean:
+        # Entries a manager already decided on are left alone
+        approved = db.execute(
+            update(Feedback)
+            .where(Feedback.id.in_(clean), Feedback.status == "pending")
+            .values(status="approved")
+            .returning(Feedback.to_user_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        summaries.record_feedback_statuses(db, [(to_user_id, "pending", "approved") for to_user_id in approved])
+    return {"scored": len(results), "approved": len(approved), "flagged": len(results) - len(clean)}
+
+
+def set_status(db: Session, ids: Iterable[int], new_status: str) -> dict:
+    """
+    Approves or rejects many entries with one UPDATE. Returns the number of changed
+    entries and the ids that do not exist. The caller commits.
+    """
+    ids = list(dict.fromkeys(ids))
+    rows = db.execute(
+        select(Feedback.id, Feedback.to_user_id, Feedback.status).where(Feedback.id.in_(ids)).with_for_update()
+    ).all()
+    changed = [row for row in rows if row.status != new_status]
+    if changed:
+        db.execute(
+            update(Feedback)
+            .where(Feedback.id.in_([row.id for row in changed]))
+            .values(status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+        summaries.record_feedback_statuses(db, [(row.to_user_id, row.status, new_status) for row in changed])
+    found = {row.id for row in rows}
+    return {"updated": len(changed), "not_found": [feedback_id for feedback_id in ids if feedback_id not in found]}
+
+
+def unmoderated_ids(db: Session, created_before: Optional[datetime] = None) -> list:
+    query = select(Feedback.id).where(Feedback.moderated_at.is_(None)).order_by(Feedback.id)
+    if created_before is not None:
+        query = query.where(Feedback.created_at < created_before)
+    return db.scalars(query).all()
+
+
+def _process_batch(ids: list) -> None:
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        counts = process(db, ids)
+        db.commit()
+        for name, count in counts.items():
+            _stats[name] += count
+    except Exception as e:
+        db.rollback()
+        _stats["failed"] += len(ids)
+        print(f"✗ Warning: Could not moderate feedback {ids[0]}..{ids[-1]}: {str(e)}")
+    finally:
+        db.close()
+
+
+def _sweep(min_age_seconds: float) -> None:
+    """Re-enqueues entries that were never scored, e.g. after a crash."""
+    from .database import SessionLocal
+
+    if not _sweep_lock.acquire(blocking=False):
+        return
+    db = SessionLocal()
+    try:
+        enqueue(unmoderated_ids(db, datetime.utcnow() - timedelta(seconds=min_age_seconds)))
+    except Exception as e:
+        print(f"✗ Warning: Could not sweep the moderation queue: {str(e)}")
+    finally:
+        db.close()
+        _sweep_lock.release()
+
+
+def _work() -> None:
+    while True:
+        try:
+            feedback_id = _queue.get(timeout=MODERATION_SWEEP_SECONDS)
+        except queue.Empty:
+            _sweep(MODERATION_SWEEP_SECONDS)
+            continue
+        if feedback_id is None:
+            return
+        batch = [feedback_id]
+        stop = False
+        while len(batch) < MODERATION_BATCH_SIZE:
+            try:
+                feedback_id = _queue.get_nowait()
+            except queue.Empty:
+                break
+            if feedback_id is None:
+                stop = True
+                break
+            batch.append(feedback_id)
+        _process_batch(batch)
+        if stop:
+            return
+
+
+def _ensure_workers() -> None:
+    with _workers_lock:
+        if _workers or MODERATION_WORKERS <= 0:
+            return
+        for i in range(MODERATION_WORKERS):
+            worker = threading.Thread(target=_work, name=f"moderation-{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def enqueue(ids: Iterable[int]) -> None:
+    """Queues committed feedback ids for scoring; a no-op with MODERATION_WORKERS=0."""
+    if MODERATION_WORKERS <= 0:
+        return
+    _ensure_workers()
+    for feedback_id in ids:
+        _queue.put(feedback_id)
+        _stats["enqueued"] += 1
+
+
+def start() -> None:
+    """Starts the workers and re-enqueues unscored entries; called on application startup."""
+    if MODERATION_WORKERS <= 0:
+        return
+    _ensure_workers()
+    _sweep(0)
+
+
+def shutdown() -> None:
+    """Lets the workers finish their current batch and stop; called on application shutdown."""
+    with _workers_lock:
+        for _ in _workers:
+            _queue.put(None)
+        _workers.clear()
+
+
+def stats() -> dict:
+    """Returns a snapshot of the queue depth and outcome counters."""
+    return {"workers": MODERATION_WORKERS, "queue_depth": _queue.qsize(), **_stats}
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        ids = unmoderated_ids(db)
+        totals = {"scored": 0, "approved": 0, "flagged": 0}
+        for start_index in range(0, len(ids), MODERATION_BATCH_SIZE):
+            counts = process(db, ids[start_index:start_index + MODERATION_BATCH_SIZE])
+            db.commit()
+            for name, count in counts.items():
+                totals[name] += count
+        print(f"✓ Moderated {totals['scored']} feedback entries ({totals['approved']} approved, {totals['flagged']} flagged)")
+    finally:
+        db.close()
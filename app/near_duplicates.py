@@ -0,0 +1,210 @@
+"""
+Near-duplicate detection for feedback: a per-process MinHash/LSH index of recent messages.
+
+Each message is normalized like the moderation filter (lowercase, leetspeak,
+collapsed whitespace) and split into overlapping SHINGLE_SIZE-character
+shingles. Its MinHash signature is computed with one-permutation hashing:
+every shingle is hashed once, and the hash is spread over SIGNATURE_SIZE bins,
+each keeping its minimum. This costs one hash per shingle instead of one per
+shingle and permutation. The share of equal bins of two signatures estimates
+the Jaccard similarity of their shingle sets.
+
+Signatures are split into BANDS bands. A message is only compared with
+earlier feedback to the same recipient that shares at least one band
+(locality-sensitive hashing), so a lookup costs a few dict probes however
+many messages are indexed. Pairs at or above NEAR_DUPLICATE_THRESHOLD count
+as near-duplicates.
+
+The index holds the feedback of the last NEAR_DUPLICATE_WINDOW_DAYS, at most
+NEAR_DUPLICATE_MAX_ENTRIES entries, evicting the oldest first. It is loaded
+from the ``feedback`` table in id order on first use, and every lookup first
+reads the rows added since (by this or another worker process).
+"""
+import operator
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models, moderation
+
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# reject: refuse near-duplicates with 409; flag: accept them and let the moderation queue flag them
+NEAR_DUPLICATE_ACTION = os.getenv("NEAR_DUPLICATE_ACTION", "reject")
+NEAR_DUPLICATE_WINDOW_DAYS = int(os.getenv("NEAR_DUPLICATE_WINDOW_DAYS", "30"))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "200000"))
+
+SHINGLE_SIZE = 5
+SIGNATURE_SIZE = 128
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+# Normalized messages shorter than this are too generic ("Great job!") to call duplicates
+MIN_LENGTH = 20
+# Rows read per query while loading
+LOAD_CHUNK_SIZE = 5000
+
+_MASK = (1 << 64) - 1
+
+
+def _canonical(text: str) -> str:
+    return " ".join(moderation.normalize(text).split())
+
+
+def signature(text: str) -> Optional[tuple]:
+    """The MinHash signature of a message, or None if it is too short to compare."""
+    text = _canonical(text)
+    if len(text) < MIN_LENGTH:
+        return None
+    bins = [None] * SIGNATURE_SIZE
+    for shingle in {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}:
+        value = hash(shingle) & _MASK
+        slot, value = value % SIGNATURE_SIZE, value // SIGNATURE_SIZE
+        current = bins[slot]
+        if current is None or value < current:
+            bins[slot] = value
+    # Densification: an empty bin takes the value of the next filled bin, tagged with
+    # the distance, so that two signatures agree on it exactly when they agree there
+    for i in range(SIGNATURE_SIZE):
+        if bins[i] is None:
+            for distance in range(1, SIGNATURE_SIZE):
+                value = bins[(i + distance) % SIGNATURE_SIZE]
+                if value is not None and not isinstance(value, tuple):
+                    bins[i] = (value, distance)
+                    break
+    return tuple(bins)
+
+
+def similarity(a: tuple, b: tuple) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(map(operator.eq, a, b)) / SIGNATURE_SIZE
+
+
+def _bands(sig: tuple) -> list:
+    return [(band, hash(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """Signatures of recent feedback, bucketed by recipient and LSH band."""
+
+    def __init__(self, window_days: int = NEAR_DUPLICATE_WINDOW_DAYS, max_entries: int = NEAR_DUPLICATE_MAX_ENTRIES):
+        self.window = timedelta(days=window_days)
+        self.max_entries = max_entries
+        # feedback id -> (recipient, signature)
+        self._entries = {}
+        # (recipient, band, band hash) -> feedback ids
+        self._buckets = {}
+        # (created_at, feedback id) in insertion order, for eviction
+        self._order = deque()
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, feedback_id: int, to_user_id: int, message: str, created_at: Optional[datetime] = None) -> None:
+        created_at = created_at or datetime.utcnow()
+        sig = signature(message)
+        with self._lock:
+            self.last_id = max(self.last_id, feedback_id)
+            if sig is None or feedback_id in self._entries or created_at < datetime.utcnow() - self.window:
+                return
+            self._entries[feedback_id] = (to_user_id, sig)
+            for band in _bands(sig):
+                self._buckets.setdefault((to_user_id, *band), set()).add(feedback_id)
+            self._order.append((created_at, feedback_id))
+            self._evict()
+
+    def remove(self, feedback_id: int) -> None:
+        with self._lock:
+            self._discard(feedback_id)
+
+    def _discard(self, feedback_id: int) -> None:
+        entry = self._entries.pop(feedback_id, None)
+        if entry is None:
+            return
+        to_user_id, sig = entry
+        for band in _bands(sig):
+            key = (to_user_id, *band)
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(feedback_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _evict(self) -> None:
+        cutoff = datetime.utcnow() - self.window
+        while self._order and (self._order[0][0] < cutoff or len(self._entries) > self.max_entries):
+            _, feedback_id = self._order.popleft()
+            self._discard(feedback_id)
+
+    def find(self, to_user_id: int, message: str, before_id: Optional[int] = None) -> Optional[Tuple[int, float]]:
+        """
+        The most similar indexed feedback to ``to_user_id`` at or above the threshold,
+        as (feedback id, similarity), considering only ids below ``before_id`` if given.
+        """
+        sig = signature(message)
+        if sig is None:
+            return None
+        best = None
+        with self._lock:
+            candidates = set()
+            for band in _bands(sig):
+                candidates.update(self._buckets.get((to_user_id, *band), ()))
+            for feedback_id in candidates:
+                if before_id is not None and feedback_id >= before_id:
+                    continue
+                score = similarity(sig, self._entries[feedback_id][1])
+                if score >= NEAR_DUPLICATE_THRESHOLD and (best is None or score > best[1]):
+                    best = (feedback_id, score)
+        return best
+
+    def sync(self, db: Session) -> int:
+        """Indexes the feedback added since the last sync; returns the number of rows read."""
+        Feedback = models.Feedback
+        cutoff = datetime.utcnow() - self.window
+        read = 0
+        while True:
+            rows = db.execute(
+                select(Feedback.id, Feedback.to_user_id, Feedback.message, Feedback.created_at)
+                .where(Feedback.id > self.last_id, Feedback.created_at >= cutoff)
+                .order_by(Feedback.id)
+                .limit(LOAD_CHUNK_SIZE)
+            ).all()
+            for row in rows:
+                self.add(row.id, row.to_user_id, row.message, row.created_at)
+            read += len(rows)
+            if len(rows) < LOAD_CHUNK_SIZE:
+                return read
+
+
+_index = NearDuplicateIndex()
+_stats = {"lookups": 0, "hits": 0}
+
+
+def index() -> NearDuplicateIndex:
+    """The process-wide index."""
+    return _index
+
+
+def load(db: Session) -> int:
+    """Fills the index from the ``feedback`` table; called on application startup."""
+    started = time.perf_counter()
+    read = _index.sync(db)
+    print(f"✓ Indexed {len(_index)} recent feedback messages for near-duplicate detection in {time.perf_counter() - started:.2f}s")
+    return read
+
+
+def find(db: Session, to_user_id: int, message: str, before_id: Optional[int] = None) -> Optional[Tuple[int, float]]:
+    """Catches up with the table, then looks ``message`` up; see NearDuplicateIndex.find."""
+    _index.sync(db)
+    match = _index.find(to_user_id, message, before_id)
+    _stats["lookups"] += 1
+    _stats["hits"] += int(match is not None)
+    return match
+
+
+def stats() -> dict:
+    return {"entries": len(_index), **_stats}
@@ -0,0 +1,92 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+
+List endpoints keep returning plain JSON arrays; when more rows are available
+the opaque cursor for the next page is returned in the ``X-Next-Cursor``
+response header and can be passed back as ``?cursor=``. Pages are selected
+with ``WHERE (created_at, id) < last-seen`` style predicates instead of
+OFFSET, so every page costs the same regardless of how deep the client pages.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or not values:
+            raise ValueError("empty cursor")
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+class PageParams:
+    """Dependency collecting ``cursor``/``limit`` and applying them to a query."""
+
+    def __init__(
+        self,
+        response: Response,
+        cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    ):
+        self.response = response
+        self.cursor = cursor
+        self.limit = limit
+
+    def apply(self, query, model, newest_first: bool = False) -> list:
+        """
+        Returns one page of ``query``. Rows are ordered by ``id`` ascending, or by
+        ``(created_at, id)`` descending when ``newest_first`` is set.
+        """
+        if newest_first:
+            query = query.order_by(model.created_at.desc(), model.id.desc())
+            if self.cursor:
+                values = decode_cursor(self.cursor)
+                try:
+                    created_at, last_id = datetime.fromisoformat(values[0]), int(values[1])
+                except (IndexError, TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+                query = query.filter(or_(
+                    model.created_at < created_at,
+                    and_(model.created_at == created_at, model.id < last_id),
+                ))
+        else:
+            query = query.order_by(model.id.asc())
+            if self.cursor:
+                try:
+                    last_id = int(decode_cursor(self.cursor)[0])
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+                query = query.filter(model.id > last_id)
+
+        rows = query.limit(self.limit + 1).all()
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            last = rows[-1]
+            key = [last.created_at, last.id] if newest_first else [last.id]
+            self.response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key)
+        return rows
+
+
+def created_between(query, model, created_after: Optional[datetime], created_before: Optional[datetime]):
+    """Applies an optional ``created_at`` date range filter."""
+    if created_after is not None:
+        query = query.filter(model.created_at >= created_after)
+    if created_before is not None:
+        query = query.filter(model.created_at < created_before)
+    return query
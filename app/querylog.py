@@ -0,0 +1,91 @@
+"""
+Opt-in SQL inspection: N+1 detection and a slow-query log.
+
+Enabled with SQL_INSPECT=log (warnings only) or SQL_INSPECT=raise (CI and
+tests). The cursor hooks in app.metrics pass every statement here. Statements
+are grouped per request after normalizing IN-lists, so ``id IN (?, ?)`` and
+``id IN (?, ?, ?)`` count as the same query. When one statement runs at least
+N_PLUS_ONE_THRESHOLD times in a single request, it is reported with the route
+that issued it. In raise mode the query that reaches the threshold fails with
+NPlusOneQuery, so the request returns a 500. Statements slower than
+SLOW_QUERY_MS are logged with their route, also outside requests.
+"""
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+
+MODE = os.getenv("SQL_INSPECT", "off").lower()
+ENABLED = MODE in ("log", "raise")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger("app.sql")
+if ENABLED and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(levelname)s [sql] %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class NPlusOneQuery(Exception):
+    """Raised in SQL_INSPECT=raise mode when a request repeats a statement too often."""
+
+
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_slow = {}
+_n_plus_one = {}
+
+
+@lru_cache(maxsize=2048)
+def normalize(statement: str) -> str:
+    """Collapses whitespace and IN-lists of bound parameters."""
+    return _IN_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _shorten(statement: str, limit: int = 500) -> str:
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def observe(timings, statement: str, seconds: float) -> None:
+    """Called after every statement; ``timings`` is the current request's RequestTimings or None."""
+    route = timings.label() if timings is not None else "-"
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        with _lock:
+            _slow[route] = _slow.get(route, 0) + 1
+        logger.warning("Slow query (%.1f ms) in %s: %s", seconds * 1000, route, _shorten(normalize(statement)))
+    if timings is None:
+        return
+
+    key = normalize(statement)
+    entry = timings.statements.setdefault(key, [0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+    if MODE == "raise" and entry[0] == N_PLUS_ONE_THRESHOLD:
+        raise NPlusOneQuery(f"{route} executed the same statement {entry[0]} times: {_shorten(key)}")
+
+
+def finish(timings) -> None:
+    """Reports the repeated statements of a finished request."""
+    route = timings.label()
+    for statement, (count, seconds) in timings.statements.items():
+        if count < N_PLUS_ONE_THRESHOLD:
+            continue
+        with _lock:
+            _n_plus_one[route] = _n_plus_one.get(route, 0) + 1
+        logger.warning(
+            "Possible N+1 in %s: %d executions (%.1f ms total) of %s",
+            route, count, seconds * 1000, _shorten(statement),
+        )
+
+
+def stats() -> dict:
+    """Per-route counts of slow queries and N+1 reports."""
+    with _lock:
+        return {"slow_queries": dict(_slow), "n_plus_one": dict(_n_plus_one)}
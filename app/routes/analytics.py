@@ -0,0 +1,130 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime, timedelta
+from .. import models, schemas, analytics, hierarchy
+from ..dependencies import get_db, require_admin, require_manager, require_employee
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+# Range used when ?start= is omitted
+DEFAULT_RANGE_DAYS = 365
+
+
+class SeriesParams:
+    """Dependency collecting the bucket size and the (inclusive, UTC) date range of a series."""
+
+    def __init__(
+        self,
+        bucket: str = Query("month", pattern="^(day|week|month|quarter)$"),
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ):
+        self.bucket = bucket
+        self.end = end or datetime.utcnow().date()
+        self.start = start or self.end - timedelta(days=DEFAULT_RANGE_DAYS)
+        if self.start > self.end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        if len(analytics.buckets(self.start, self.end, bucket)) > analytics.MAX_POINTS:
+            raise HTTPException(status_code=400, detail=f"A series can have at most {analytics.MAX_POINTS} points; use a larger bucket")
+
+    def build(self, db: Session, scope: str, key, employee_filter=None) -> dict:
+        return {
+            "scope": scope,
+            "key": None if key is None else str(key),
+            "bucket": self.bucket,
+            "start": self.start,
+            "end": self.end,
+            "points": analytics.series(db, self.bucket, self.start, self.end, employee_filter),
+        }
+
+
+def _check_manager_access(db: Session, current_user: models.User, manager_id: int) -> None:
+    # Managers may look at their own team and org, and at those of managers below them
+    if current_user.role == "Admin" or manager_id == current_user.id:
+        return
+    if not hierarchy.is_in_org(db, manager_id, current_user.id):
+        raise HTTPException(status_code=403, detail="You can only view analytics for your own org")
+
+
+@router.get("/employees/{employee_id}", response_model=schemas.TimeSeries)
+def employee_series(
+    employee_id: int,
+    series: SeriesParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_employee)
+):
+    """
+    Rating, feedback and KPI trends of one employee. Employees can see their own,
+    managers those of anyone in their org, admins anyone's.
+    """
+    if current_user.role != "Admin" and employee_id != current_user.id:
+        if current_user.role != "Manager" or not hierarchy.is_in_org(db, employee_id, current_user.id):
+            raise HTTPException(status_code=403, detail="You can only view analytics for yourself or your own org")
+    return series.build(db, "employee", employee_id, analytics.Rollup.employee_id == employee_id)
+
+
+@router.get("/teams/{manager_id}", response_model=schemas.TimeSeries)
+def team_series(
+    manager_id: int,
+    series: SeriesParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    Trends of a manager's direct reports, by current team membership.
+    """
+    _check_manager_access(db, current_user, manager_id)
+    team = select(models.User.id).where(models.User.manager_id == manager_id)
+    return series.build(db, "team", manager_id, analytics.Rollup.employee_id.in_(team))
+
+
+@router.get("/orgs/{manager_id}", response_model=schemas.TimeSeries)
+def org_series(
+    manager_id: int,
+    series: SeriesParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    Trends of everyone below a manager at any depth.
+    """
+    _check_manager_access(db, current_user, manager_id)
+    return series.build(db, "org", manager_id, analytics.Rollup.employee_id.in_(hierarchy.org_ids(manager_id)))
+
+
+@router.get("/departments/{department}", response_model=schemas.TimeSeries)
+def department_series(
+    department: str,
+    series: SeriesParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    Trends of a department, by current department membership. Managers can see their own department.
+    """
+    if current_user.role != "Admin" and current_user.department != department:
+        raise HTTPException(status_code=403, detail="You can only view analytics for your own department")
+    members = select(models.User.id).where(models.User.department == department)
+    return series.build(db, "department", department, analytics.Rollup.employee_id.in_(members))
+
+
+@router.get("/company", response_model=schemas.TimeSeries)
+def company_series(
+    series: SeriesParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """
+    Organisation-wide trends. Only accessible by Admins.
+    """
+    return series.build(db, "company", None)
+
+
+@router.post("/rebuild")
+def rebuild_rollups(db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can recompute the daily rollups from the source tables
+    written = analytics.rebuild(db)
+    db.commit()
+    return {"detail": "Activity rollups rebuilt", "rows": written}
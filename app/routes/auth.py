@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .. import schemas, models, auth
-from ..dependencies import get_db, get_current_user, require_roles, require_admin
+from .. import schemas, models, auth, summaries, hierarchy, hashing, database
+from ..dependencies import get_db, get_async_db, get_current_user, require_roles, require_admin
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -27,15 +30,20 @@ def health_check(db: Session = Depends(get_db)):
         }
 
 
+# The auth handlers are async so that password hashing can be awaited on the
+# hashing pool; their blocking DB work runs in the threadpool.
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """OAuth2 password flow for login. Returns JWT token."""
     # Try to find user by email (treating username field as email)
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+    user = await db.scalar(select(models.User).where(models.User.email == form_data.username).limit(1))
+    if not user:
+        # Emails are stored normalized; the exact match above finds rows stored before that
+        user = await db.scalar(select(models.User).where(models.User.email == auth.normalize_email(form_data.username)).limit(1))
     
     # If not found by email, try direct username match
     if not user:
-        user = db.query(models.User).filter(models.User.name == form_data.username).first()
+        user = await db.scalar(select(models.User).where(models.User.name == form_data.username).limit(1))
     
     # Verify credentials
     if not user:
@@ -44,7 +52,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="User not found"
         )
     
-    if not auth.verify_password(form_data.password, user.password_hash):
+    if not await hashing.verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="Incorrect password"
@@ -68,8 +76,34 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         )
 
 
+def _email_taken(db: Session, email: str) -> bool:
+    return db.query(models.User.id).filter(func.lower(models.User.email) == auth.normalize_email(email)).first() is not None
+
+
+def _create_registered_user(db: Session, user: models.User) -> models.User:
+    db.add(user)
+    db.flush()
+    summaries.record_user(db, user)
+    hierarchy.add_user(db, user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@router.get("/hashing-stats")
+def hashing_stats(current_user: models.User = Depends(require_admin)):
+    """Queue depth and latency metrics of the password hashing pool. Admins only."""
+    return hashing.stats()
+
+
+@router.get("/pool-stats")
+def pool_stats(current_user: models.User = Depends(require_admin)):
+    """Database connection pool usage and checkout counters. Admins only."""
+    return database.pool_stats()
+
+
 @router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def register(new_user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(new_user: schemas.UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user. This is a public endpoint for self-registration.
     New users will default to the 'Employee' role.
@@ -85,14 +119,13 @@ def register(new_user: schemas.UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
     
     # Check if email already exists
-    existing_user = db.query(models.User).filter(models.User.email == new_user.email).first()
-    if existing_user:
+    if await run_in_threadpool(_email_taken, db, new_user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    # Hash password
+    hashed_password = await hashing.hash_password(new_user.password)
+
     try:
-        # Hash password
-        hashed_password = auth.get_password_hash(new_user.password)
-        
         # Determine role (validate it's acceptable)
         role = new_user.role or "Employee"
         if role not in ["Admin", "Manager", "Employee"]:
@@ -101,7 +134,7 @@ def register(new_user: schemas.UserCreate, db: Session = Depends(get_db)):
         # Create user
         user = models.User(
             name=new_user.name.strip(),
-            email=new_user.email.strip().lower(),
+            email=auth.normalize_email(new_user.email),
             password_hash=hashed_password,
             role=role,
             department=new_user.department or "",
@@ -109,15 +142,13 @@ def register(new_user: schemas.UserCreate, db: Session = Depends(get_db)):
             is_active=True
         )
         
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        user = await run_in_threadpool(_create_registered_user, db, user)
         
         print(f"✓ User registered successfully: {user.email}")
         return user
         
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         print(f"✗ Registration error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import Optional
+from datetime import datetime
+import csv
+import io
+import json
+from .. import models
+from ..database import SessionLocal
+from ..dependencies import require_admin
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+# Rows fetched per round-trip from the server-side cursor and written per chunk
+CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = {
+    "performance": (models.PerformanceReview, ["id", "employee_id", "manager_id", "rating", "comments", "created_at"]),
+    "feedback": (models.Feedback, ["id", "from_user_id", "to_user_id", "message", "is_anonymous", "status", "created_at"]),
+    "kpi-results": (models.KPIResult, ["id", "kpi_id", "employee_id", "achieved_value", "status", "score", "created_at"]),
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _stream_rows(table: str, fmt: str, since: Optional[datetime]):
+    """
+    Generator streaming one table in (created_at, id) order.
+    It opens its own session because the request-scoped one is closed before
+    a streaming body is sent; yield_per makes the driver use a server-side
+    cursor, so memory stays constant regardless of table size.
+    """
+    model, columns = EXPORT_COLUMNS[table]
+    stmt = select(*[getattr(model, name) for name in columns]).order_by(model.created_at, model.id)
+    if since is not None:
+        stmt = stmt.where(model.created_at >= since)
+
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=CHUNK_SIZE))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for rows in result.partitions():
+                writer.writerows([[_serialize(v) for v in row] for row in rows])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, map(_serialize, row)))) + "\n" for row in rows
+                )
+    finally:
+        db.close()
+
+
+def _export(table: str, fmt: str, since: Optional[datetime]) -> StreamingResponse:
+    filename = f"{table}.{fmt}"
+    return StreamingResponse(
+        _stream_rows(table, fmt, since),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# Each export accepts ?format=ndjson|csv and an optional ?since= watermark.
+# Rows are ordered by created_at, so the newest created_at of one pull can be
+# passed as `since` for the next incremental pull (the bound is inclusive;
+# de-duplicate on id).
+@router.get("/performance")
+def export_performance_reviews(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    current_user: models.User = Depends(require_admin)
+):
+    return _export("performance", format, since)
+
+
+@router.get("/feedback")
+def export_feedback(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    current_user: models.User = Depends(require_admin)
+):
+    return _export("feedback", format, since)
+
+
+@router.get("/kpi-results")
+def export_kpi_results(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    current_user: models.User = Depends(require_admin)
+):
+    return _export("kpi-results", format, since)
@@ -1,31 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas
-from ..dependencies import get_db, require_admin, require_manager, require_employee
+from typing import List, Optional
+from datetime import datetime
+from .. import models, schemas, summaries, analytics, moderation, moderation_queue, near_duplicates, serialization
+from ..pagination import PageParams, created_between
+from ..dependencies import get_db, get_async_db, require_admin, require_manager, require_employee
 
 router = APIRouter(prefix="/api/feedback", tags=["feedback"])
 
-# simple abusive words list
-ABUSIVE = {"badword", "idiot", "stupid"}
-
-
-def is_abusive(text: str) -> bool:
-    """
-    Checks if a given text contains any abusive words from a predefined list.
-    This is a simple content moderation function.
-    """
-    t = text.lower()
-    return any(w in t for w in ABUSIVE)
-
+# Upper bound on the ids of a single bulk approve/reject
+MAX_BULK_SIZE = 1000
 
 @router.get("/", response_model=List[schemas.FeedbackOut])
-def get_all_feedback(db: Session = Depends(get_db), current_user: models.User = Depends(require_manager)):
+def get_all_feedback(
+    status: Optional[str] = None,
+    to_user_id: Optional[int] = None,
+    department: Optional[str] = None,
+    moderated: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
     """
-    Retrieves all feedback for all users.
-    Only accessible by Admins and Managers.
+    Retrieves feedback for all users, newest first, filtered by status, recipient,
+    recipient department, moderation state and creation date. ``?status=pending&moderated=true``
+    lists the entries flagged for review. Only accessible by Admins and Managers.
     """
-    return db.query(models.Feedback).all()
+    query = db.query(*serialization.select_columns(schemas.FeedbackOut, models.Feedback))
+    if status is not None:
+        query = query.filter(models.Feedback.status == status)
+    if to_user_id is not None:
+        query = query.filter(models.Feedback.to_user_id == to_user_id)
+    if department is not None:
+        query = query.join(models.User, models.User.id == models.Feedback.to_user_id).filter(models.User.department == department)
+    if moderated is not None:
+        moderated_at = models.Feedback.moderated_at
+        query = query.filter(moderated_at.isnot(None) if moderated else moderated_at.is_(None))
+    query = created_between(query, models.Feedback, created_after, created_before)
+    return serialization.list_response(schemas.FeedbackOut, page.apply(query, models.Feedback, newest_first=True), page)
 
 
 @router.post("", response_model=schemas.FeedbackOut, status_code=status.HTTP_201_CREATED, include_in_schema=False)
@@ -36,12 +51,17 @@ def post_feedback(
     current_user: models.User = Depends(require_employee)
 ):
     """
-    Allows any authenticated user to submit feedback for another user.
+    Allows any authenticated user to submit feedback for another user. Near-duplicates
+    of recent feedback to the same user are refused (or flagged, with NEAR_DUPLICATE_ACTION=flag).
+    The entry is queued for moderation and either approved automatically or flagged for a manager.
     """
     if not data.message.strip():
         raise HTTPException(status_code=400, detail="Feedback message cannot be empty")
-    if is_abusive(data.message):
+    if moderation.is_abusive(data.message):
         raise HTTPException(status_code=400, detail="Abusive content is not allowed")
+    if near_duplicates.NEAR_DUPLICATE_ACTION == "reject":
+        if near_duplicates.find(db, data.to_user_id, data.message) is not None:
+            raise HTTPException(status_code=409, detail="This feedback nearly repeats a recent message to the same user")
 
     from_user_id = None if data.is_anonymous else current_user.id
     
@@ -52,8 +72,12 @@ def post_feedback(
         is_anonymous=data.is_anonymous
     )
     db.add(feedback)
+    db.flush()
+    summaries.record_feedback(db, feedback)
+    analytics.record_feedback(db, feedback)
     db.commit()
     db.refresh(feedback)
+    moderation_queue.enqueue([feedback.id])
     return feedback
 
 
@@ -69,7 +93,9 @@ def approve_feedback(
     feedback = db.query(models.Feedback).filter(models.Feedback.id == feedback_id).first()
     if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found")
+    old_status = feedback.status
     feedback.status = "approved"
+    summaries.record_feedback_status(db, feedback, old_status)
     db.commit()
     db.refresh(feedback)
     return feedback
@@ -87,19 +113,71 @@ def reject_feedback(
     feedback = db.query(models.Feedback).filter(models.Feedback.id == feedback_id).first()
     if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found")
+    old_status = feedback.status
     feedback.status = "rejected"
+    summaries.record_feedback_status(db, feedback, old_status)
     db.commit()
     db.refresh(feedback)
     return feedback
 
 
+def _bulk_set_status(db: Session, ids: List[int], new_status: str) -> dict:
+    if not ids:
+        raise HTTPException(status_code=400, detail="No feedback ids given")
+    if len(ids) > MAX_BULK_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_SIZE} feedback entries can be updated at once")
+    result = moderation_queue.set_status(db, ids, new_status)
+    db.commit()
+    return result
+
+
+@router.post("/bulk/approve", response_model=schemas.FeedbackBulkResult)
+def bulk_approve_feedback(
+    data: schemas.FeedbackBulkAction,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    Approves many feedback entries with a single UPDATE. Only accessible by Admins and Managers.
+    """
+    return _bulk_set_status(db, data.ids, "approved")
+
+
+@router.post("/bulk/reject", response_model=schemas.FeedbackBulkResult)
+def bulk_reject_feedback(
+    data: schemas.FeedbackBulkAction,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    Rejects many feedback entries with a single UPDATE. Only accessible by Admins and Managers.
+    """
+    return _bulk_set_status(db, data.ids, "rejected")
+
+
 @router.get("/me", response_model=List[schemas.FeedbackOut])
-def get_my_feedback(db: Session = Depends(get_db), current_user: models.User = Depends(require_employee)):
+async def get_my_feedback(
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(require_employee)
+):
     """
-    Retrieves all feedback received by the currently logged-in user.
+    Retrieves feedback received by the currently logged-in user, newest first.
     """
-    feedback_list = db.query(models.Feedback).filter(models.Feedback.to_user_id == current_user.id).all()
-    return feedback_list
+    def _page(session: Session):
+        query = (
+            session.query(*serialization.select_columns(schemas.FeedbackOut, models.Feedback))
+            .filter(models.Feedback.to_user_id == current_user.id)
+        )
+        if status is not None:
+            query = query.filter(models.Feedback.status == status)
+        query = created_between(query, models.Feedback, created_after, created_before)
+        return page.apply(query, models.Feedback, newest_first=True)
+
+    return serialization.list_response(schemas.FeedbackOut, await db.run_sync(_page), page)
 
 
 @router.delete("/{feedback_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -114,6 +192,22 @@ def delete_feedback(
     feedback = db.query(models.Feedback).filter(models.Feedback.id == feedback_id).first()
     if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found")
+    summaries.record_feedback(db, feedback, delta=-1)
+    analytics.record_feedback(db, feedback, delta=-1)
     db.delete(feedback)
     db.commit()
+    near_duplicates.index().remove(feedback_id)
     return {"detail": "Feedback deleted successfully"}
+
+
+@router.post("/moderation/reload")
+def reload_moderation_terms(current_user: models.User = Depends(require_admin)):
+    # Only admins can force a reload of the blocked-term list (it is also picked up automatically)
+    terms = moderation.moderator().reload()
+    return {"detail": "Moderation terms reloaded", "terms": terms}
+
+
+@router.get("/moderation/queue")
+def moderation_queue_stats(current_user: models.User = Depends(require_admin)):
+    # Only admins can inspect the moderation workers
+    return moderation_queue.stats()
@@ -1,18 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas
+from typing import List, Optional
+import csv
+import io
+from .. import models, schemas, summaries, hierarchy, analytics, leaderboard, serialization
+from ..pagination import PageParams
 from ..dependencies import get_db, require_admin, require_manager
 
 router = APIRouter(prefix="/api/kpi", tags=["kpi"])
 
+# Upper bound on evaluations per batch request
+MAX_BATCH_SIZE = 50000
+# Size of the id lists passed to a single IN (...) lookup
+LOOKUP_CHUNK_SIZE = 5000
+
+
+def score_kpi(achieved_value: float, target: float, weightage: float):
+    """Returns the (status, score) of an achieved value against a KPI target."""
+    percent_achieved = (achieved_value / target) if target > 0 else 0
+    status = "Achieved" if percent_achieved >= 1 else "Not Achieved"
+    return status, percent_achieved * weightage * 100
+
 
 @router.get("/", response_model=List[schemas.KPIOut])
-def get_all_kpis(db: Session = Depends(get_db), current_user: models.User = Depends(require_manager)):
+def get_all_kpis(
+    department: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
     """
-    Retrieves all KPIs. Accessible only by Admins and Managers.
+    Retrieves all KPIs, optionally filtered by department. Accessible only by Admins and Managers.
     """
-    return db.query(models.KPI).all()
+    query = db.query(*serialization.select_columns(schemas.KPIOut, models.KPI))
+    if department is not None:
+        query = query.filter(models.KPI.department == department)
+    return serialization.list_response(schemas.KPIOut, page.apply(query, models.KPI), page)
 
 
 @router.post("/", response_model=schemas.KPIOut)
@@ -45,12 +69,10 @@ def evaluate_kpi_performance(
         raise HTTPException(status_code=404, detail="Employee not found")
 
     # Security check for managers
-    if current_user.role == "Manager" and employee.manager_id != current_user.id:
+    if current_user.role == "Manager" and not hierarchy.is_in_org(db, employee.id, current_user.id):
         raise HTTPException(status_code=403, detail="You can only evaluate your own team members")
 
-    percent_achieved = (evaluation.achieved_value / kpi.target) if kpi.target > 0 else 0
-    status = "Achieved" if percent_achieved >= 1 else "Not Achieved"
-    score = percent_achieved * kpi.weightage * 100
+    status, score = score_kpi(evaluation.achieved_value, kpi.target, kpi.weightage)
 
     result = models.KPIResult(
         kpi_id=evaluation.kpi_id,
@@ -60,6 +82,107 @@ def evaluate_kpi_performance(
         score=score
     )
     db.add(result)
+    db.flush()
+    summaries.record_kpi_result(db, result)
+    analytics.record_kpi_result(db, result)
+    leaderboard.record_result(db, result)
     db.commit()
     db.refresh(result)
     return result
+
+
+def _load_by_id(db: Session, columns, id_column, ids) -> dict:
+    """Loads rows for the given ids, keyed by id, with one IN query per chunk of ids."""
+    ids = list(ids)
+    rows = {}
+    for start in range(0, len(ids), LOOKUP_CHUNK_SIZE):
+        chunk = ids[start:start + LOOKUP_CHUNK_SIZE]
+        for row in db.query(id_column, *columns).filter(id_column.in_(chunk)):
+            rows[row[0]] = row
+    return rows
+
+
+def _evaluate_batch(db: Session, current_user: models.User, evaluations: list, errors: list) -> schemas.KPIBatchResult:
+    """
+    Scores and inserts a batch of (index, kpi_id, employee_id, achieved_value) evaluations.
+    Referenced KPIs and employees are loaded with one query each, invalid rows are
+    reported in ``errors`` and all valid rows are inserted with a single commit.
+    """
+    if len(evaluations) + len(errors) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"A batch can contain at most {MAX_BATCH_SIZE} evaluations")
+
+    kpis = _load_by_id(db, [models.KPI.target, models.KPI.weightage], models.KPI.id, {e[1] for e in evaluations})
+    employees = _load_by_id(db, [models.User.manager_id], models.User.id, {e[2] for e in evaluations})
+    in_org = hierarchy.members_among(db, current_user.id, employees) if current_user.role == "Manager" else None
+
+    rows = []
+    touched = []
+    for index, kpi_id, employee_id, achieved_value in evaluations:
+        kpi = kpis.get(kpi_id)
+        employee = employees.get(employee_id)
+        if not kpi:
+            errors.append(schemas.BatchRowError(index=index, detail="KPI not found"))
+        elif not employee:
+            errors.append(schemas.BatchRowError(index=index, detail="Employee not found"))
+        elif in_org is not None and employee_id not in in_org:
+            errors.append(schemas.BatchRowError(index=index, detail="You can only evaluate your own team members"))
+        else:
+            status, score = score_kpi(achieved_value, kpi.target, kpi.weightage)
+            rows.append({
+                "kpi_id": kpi_id,
+                "employee_id": employee_id,
+                "achieved_value": achieved_value,
+                "status": status,
+                "score": score,
+            })
+            touched.append((employee_id, employee.manager_id, status == "Achieved"))
+
+    if rows:
+        db.execute(insert(models.KPIResult), rows)
+        summaries.record_kpi_results(db, touched)
+        analytics.record_kpi_results(db, [(employee_id, achieved) for employee_id, _, achieved in touched])
+        leaderboard.record_results(db, [(row["kpi_id"], row["employee_id"], row["score"]) for row in rows])
+        db.commit()
+
+    errors.sort(key=lambda error: error.index)
+    return schemas.KPIBatchResult(created=len(rows), errors=errors)
+
+
+@router.post("/evaluate/batch", response_model=schemas.KPIBatchResult)
+def evaluate_kpi_batch(
+    batch: schemas.KPIBatchEvaluate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    Evaluates many (KPI, employee) pairs in one request. Valid rows are stored,
+    invalid rows are reported by their position in the list.
+    Accessible by Admins and Managers (for their own org).
+    """
+    evaluations = [(i, e.kpi_id, e.employee_id, e.achieved_value) for i, e in enumerate(batch.evaluations)]
+    return _evaluate_batch(db, current_user, evaluations, [])
+
+
+@router.post("/evaluate/batch/csv", response_model=schemas.KPIBatchResult)
+def evaluate_kpi_batch_csv(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    Same as /evaluate/batch, but reads the evaluations from an uploaded CSV file with a
+    header row of kpi_id, employee_id and achieved_value. Errors are reported by data
+    row number, starting at 0.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig"))
+    missing = {"kpi_id", "employee_id", "achieved_value"} - set(reader.fieldnames or [])
+    if missing:
+        raise HTTPException(status_code=400, detail=f"CSV is missing columns: {', '.join(sorted(missing))}")
+
+    evaluations, errors = [], []
+    for index, row in enumerate(reader):
+        try:
+            evaluations.append((index, int(row["kpi_id"]), int(row["employee_id"]), float(row["achieved_value"])))
+        except (TypeError, ValueError):
+            errors.append(schemas.BatchRowError(index=index, detail="Invalid kpi_id, employee_id or achieved_value"))
+    return _evaluate_batch(db, current_user, evaluations, errors)
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import models, schemas, leaderboard, hierarchy
+from ..dependencies import get_db, require_admin, require_manager, require_employee
+
+router = APIRouter(prefix="/api/leaderboard", tags=["leaderboard"])
+
+Limit = Query(10, ge=1, le=leaderboard.MAX_TOP)
+
+
+@router.get("/kpis/{kpi_id}", response_model=schemas.Leaderboard)
+def kpi_leaderboard(
+    kpi_id: int,
+    limit: int = Limit,
+    department: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    The best latest scores on a KPI, optionally within one department. Managers can see
+    the whole company or their own department.
+    """
+    if db.get(models.KPI, kpi_id) is None:
+        raise HTTPException(status_code=404, detail="KPI not found")
+    if current_user.role != "Admin" and department not in (None, current_user.department):
+        raise HTTPException(status_code=403, detail="You can only view leaderboards for your own department")
+    return {"scope": "kpi", "key": str(kpi_id), **leaderboard.top_for_kpi(db, kpi_id, limit, department)}
+
+
+@router.get("/departments/{department}", response_model=schemas.Leaderboard)
+def department_leaderboard(
+    department: str,
+    limit: int = Limit,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
+    """
+    The best total KPI scores in a department. Managers can see their own department.
+    """
+    if current_user.role != "Admin" and current_user.department != department:
+        raise HTTPException(status_code=403, detail="You can only view leaderboards for your own department")
+    return {"scope": "department", "key": department, **leaderboard.top_by_total(db, limit, department)}
+
+
+@router.get("/company", response_model=schemas.Leaderboard)
+def company_leaderboard(
+    limit: int = Limit,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """
+    The best total KPI scores organisation-wide. Only accessible by Admins.
+    """
+    return {"scope": "company", "key": None, **leaderboard.top_by_total(db, limit)}
+
+
+@router.get("/employees/{employee_id}", response_model=schemas.EmployeeStanding)
+def employee_standing(
+    employee_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_employee)
+):
+    """
+    An employee's rank and percentile on each KPI and by total score in their department.
+    Employees can see their own, managers those of anyone in their org, admins anyone's.
+    """
+    if current_user.role != "Admin" and employee_id != current_user.id:
+        if current_user.role != "Manager" or not hierarchy.is_in_org(db, employee_id, current_user.id):
+            raise HTTPException(status_code=403, detail="You can only view standings for yourself or your own org")
+    employee = db.get(models.User, employee_id)
+    if employee is None:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return leaderboard.standing(db, employee)
+
+
+@router.post("/rebuild")
+def rebuild_leaderboards(db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can recompute the KPI standings and totals from kpi_results
+    written = leaderboard.rebuild(db)
+    db.commit()
+    return {"detail": "KPI leaderboards rebuilt", "rows": written}
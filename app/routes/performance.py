@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas
-from ..dependencies import get_db, require_admin, require_manager, require_employee
+from typing import List, Optional
+from datetime import datetime
+from .. import models, schemas, summaries, hierarchy, analytics, serialization
+from ..pagination import PageParams, created_between
+from ..dependencies import get_db, get_async_db, require_admin, require_manager, require_employee
 
 
 router = APIRouter(prefix="/api/performance", tags=["performance"])
@@ -16,14 +19,14 @@ def create_performance_review(
 ):
     """
     Creates a new performance review. Only accessible by Managers and Admins.
-    A manager can only review an employee they manage. An admin can review anyone.
+    A manager can only review employees in their org (direct or indirect reports). An admin can review anyone.
     """
     employee = db.query(models.User).filter(models.User.id == review_in.employee_id).first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    # Security check: Managers can only review their own team members
-    if current_user.role == "Manager" and employee.manager_id != current_user.id:
+    # Security check: Managers can only review people in their own org
+    if current_user.role == "Manager" and not hierarchy.is_in_org(db, employee.id, current_user.id):
         raise HTTPException(status_code=403, detail="You can only review your own team members")
 
     review = models.PerformanceReview(
@@ -33,41 +36,88 @@ def create_performance_review(
         comments=review_in.comments
     )
     db.add(review)
+    db.flush()
+    summaries.record_review(db, review)
+    analytics.record_review(db, review)
     db.commit()
     db.refresh(review)
     return review
 
 
 @router.get("/me", response_model=List[schemas.PerformanceOut])
-def get_my_performance_reviews(db: Session = Depends(get_db), current_user: models.User = Depends(require_employee)):
+async def get_my_performance_reviews(
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(require_employee)
+):
     """
-    Gets all performance reviews for the currently logged-in user.
+    Gets performance reviews for the currently logged-in user, newest first.
     Accessible by any authenticated user.
     """
-    reviews = db.query(models.PerformanceReview).filter(models.PerformanceReview.employee_id == current_user.id).all()
-    return reviews
+    def _page(session: Session):
+        query = (
+            session.query(*serialization.select_columns(schemas.PerformanceOut, models.PerformanceReview))
+            .filter(models.PerformanceReview.employee_id == current_user.id)
+        )
+        query = created_between(query, models.PerformanceReview, created_after, created_before)
+        return page.apply(query, models.PerformanceReview, newest_first=True)
+
+    return serialization.list_response(schemas.PerformanceOut, await db.run_sync(_page), page)
 
 
 @router.get("/employee/{employee_id}", response_model=List[schemas.PerformanceOut])
-def get_employee_performance_reviews(employee_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(require_manager)):
+def get_employee_performance_reviews(
+    employee_id: int,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_manager)
+):
     """
     Gets all performance reviews for a specific employee.
-    Accessible by Managers (for their team) and Admins (for anyone).
+    Accessible by Managers (for their org) and Admins (for anyone).
     """
     employee = db.query(models.User).filter(models.User.id == employee_id).first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    if current_user.role == "Manager" and employee.manager_id != current_user.id:
+    if current_user.role == "Manager" and not hierarchy.is_in_org(db, employee.id, current_user.id):
         raise HTTPException(status_code=403, detail="You can only view reviews for your own team members")
 
-    reviews = db.query(models.PerformanceReview).filter(models.PerformanceReview.employee_id == employee_id).all()
-    return reviews
+    query = (
+        db.query(*serialization.select_columns(schemas.PerformanceOut, models.PerformanceReview))
+        .filter(models.PerformanceReview.employee_id == employee_id)
+    )
+    query = created_between(query, models.PerformanceReview, created_after, created_before)
+    rows = page.apply(query, models.PerformanceReview, newest_first=True)
+    return serialization.list_response(schemas.PerformanceOut, rows, page)
 
 @router.get("/", response_model=List[schemas.PerformanceOut])
-def get_all_performance_reviews(db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+def get_all_performance_reviews(
+    employee_id: Optional[int] = None,
+    manager_id: Optional[int] = None,
+    department: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
     """
-    Gets all performance reviews in the system.
+    Gets performance reviews in the system, newest first, filtered by employee,
+    reviewing manager, employee department and creation date.
     Only accessible by Admins.
     """
-    return db.query(models.PerformanceReview).all()
+    query = db.query(*serialization.select_columns(schemas.PerformanceOut, models.PerformanceReview))
+    if employee_id is not None:
+        query = query.filter(models.PerformanceReview.employee_id == employee_id)
+    if manager_id is not None:
+        query = query.filter(models.PerformanceReview.manager_id == manager_id)
+    if department is not None:
+        query = query.join(models.User, models.User.id == models.PerformanceReview.employee_id).filter(models.User.department == department)
+    query = created_between(query, models.PerformanceReview, created_after, created_before)
+    rows = page.apply(query, models.PerformanceReview, newest_first=True)
+    return serialization.list_response(schemas.PerformanceOut, rows, page)
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from .. import models, schemas, search, serialization
+from ..pagination import PageParams
+from ..dependencies import get_db, require_admin
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+class SearchParams:
+    """Dependency collecting the query text and the filters shared by the search endpoints."""
+
+    def __init__(
+        self,
+        q: str = Query(..., min_length=1, max_length=search.MAX_QUERY_LENGTH, description='Words, all of which must match, and "quoted phrases"'),
+        user_id: Optional[int] = None,
+        department: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ):
+        self.q = q
+        self.filters = {
+            "user_id": user_id,
+            "department": department,
+            "created_after": created_after,
+            "created_before": created_before,
+        }
+
+
+@router.get("/feedback", response_model=List[schemas.FeedbackSearchHit])
+def search_feedback(
+    params: SearchParams = Depends(),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """
+    Full-text search over feedback messages, best match first. ``user_id`` and ``department``
+    filter by recipient. Only accessible by Admins.
+    """
+    columns = serialization.select_columns(schemas.FeedbackOut, models.Feedback)
+    rows = search.search(db, search.SOURCES["feedback"], params.q, columns, page, **params.filters)
+    return serialization.list_response(schemas.FeedbackSearchHit, rows, page)
+
+
+@router.get("/reviews", response_model=List[schemas.ReviewSearchHit])
+def search_reviews(
+    params: SearchParams = Depends(),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_admin)
+):
+    """
+    Full-text search over performance review comments, best match first. ``user_id`` and
+    ``department`` filter by the reviewed employee. Only accessible by Admins.
+    """
+    columns = serialization.select_columns(schemas.PerformanceOut, models.PerformanceReview)
+    rows = search.search(db, search.SOURCES["reviews"], params.q, columns, page, **params.filters)
+    return serialization.list_response(schemas.ReviewSearchHit, rows, page)
+
+
+@router.post("/rebuild")
+def rebuild_search_index(db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can rebuild the SQLite full-text tables (a no-op on PostgreSQL)
+    search.rebuild(db)
+    db.commit()
+    return {"detail": "Search indexes rebuilt"}
@@ -1,62 +1,287 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas
-from ..dependencies import get_db, require_admin, require_manager, require_employee, get_current_user
+from typing import List, Optional
+from datetime import datetime
+import csv
+import io
+from .. import models, schemas, dashboard, summaries, hierarchy, leaderboard, auth, hashing, serialization
+from ..pagination import PageParams, created_between
+from ..dependencies import get_db, get_async_db, require_admin, require_manager, require_employee, get_current_user, invalidate_principal
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
+VALID_ROLES = ("Admin", "Manager", "Employee")
+# Upper bound on users per import request
+MAX_IMPORT_SIZE = 20000
+# Rows per INSERT statement and per IN (...) lookup during imports
+IMPORT_CHUNK_SIZE = 1000
+
 
 # Any authenticated user can see the list of users.
 # The empty string route handles requests to /api/users without a trailing slash.
 @router.get("", response_model=List[schemas.UserOut], include_in_schema=False)
 @router.get("/", response_model=List[schemas.UserOut])
-def list_users(db: Session = Depends(get_db), current_user: models.User = Depends(require_employee)):
-    users = db.query(models.User).all()
-    return users
+def list_users(
+    department: Optional[str] = None,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    manager_id: Optional[int] = None,
+    org_of: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(require_employee)
+):
+    query = db.query(*serialization.select_columns(schemas.UserOut, models.User))
+    if department is not None:
+        query = query.filter(models.User.department == department)
+    if role is not None:
+        query = query.filter(models.User.role == role)
+    if is_active is not None:
+        query = query.filter(models.User.is_active == is_active)
+    if manager_id is not None:
+        query = query.filter(models.User.manager_id == manager_id)
+    if org_of is not None:
+        # Everyone reporting to org_of, directly or indirectly
+        query = query.filter(models.User.id.in_(hierarchy.org_ids(org_of)))
+    query = created_between(query, models.User, created_after, created_before)
+    return serialization.list_response(schemas.UserOut, page.apply(query, models.User), page)
 
 
-@router.post("/", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
-    # Only admins can create new users
-    if db.query(models.User).filter(models.User.email == user_in.email).first():
+def _email_taken(db: Session, email: str, exclude_id: Optional[int] = None) -> bool:
+    # Case-insensitive, so rows stored before emails were normalized still count
+    query = db.query(models.User.id).filter(func.lower(models.User.email) == auth.normalize_email(email))
+    if exclude_id is not None:
+        query = query.filter(models.User.id != exclude_id)
+    return query.first() is not None
+
+
+def _insert_user(db: Session, user_in: schemas.UserCreate, password_hash: str) -> models.User:
+    # Checked again: the email may have been taken while the password was hashed
+    if _email_taken(db, user_in.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
         
-    from ..auth import get_password_hash
     user = models.User(
         name=user_in.name, 
         email=user_in.email, 
-        password_hash=get_password_hash(user_in.password), 
+        password_hash=password_hash, 
         role=user_in.role, 
         department=user_in.department, 
         manager_id=user_in.manager_id
     )
     db.add(user)
+    db.flush()
+    summaries.record_user(db, user)
+    hierarchy.add_user(db, user)
     db.commit()
     db.refresh(user)
     return user
 
 
-@router.put("/{user_id}", response_model=schemas.UserOut)
-def update_user(user_id: int, user_in: schemas.UserUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
-    # Only admins can update user information
+# create_user and update_user are async so that password hashing is awaited on the
+# hashing pool instead of holding a threadpool worker; DB work runs in the threadpool.
+@router.post("/", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
+async def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can create new users. Duplicates are refused before they take a hashing slot.
+    user_in.email = auth.normalize_email(user_in.email)
+    if await run_in_threadpool(_email_taken, db, user_in.email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    password_hash = await hashing.hash_password(user_in.password)
+    return await run_in_threadpool(_insert_user, db, user_in, password_hash)
+
+
+def _chunks(items: list):
+    for start in range(0, len(items), IMPORT_CHUNK_SIZE):
+        yield items[start:start + IMPORT_CHUNK_SIZE]
+
+
+def _users_by_email(db: Session, emails) -> dict:
+    """
+    Maps normalized email -> (id, role) for the existing users among ``emails`` (normalized),
+    matching case-insensitively, one IN query per chunk.
+    """
+    found = {}
+    lowered = func.lower(models.User.email)
+    for chunk in _chunks(list(emails)):
+        for user_id, email, role in db.query(models.User.id, lowered, models.User.role).filter(lowered.in_(chunk)):
+            found[email] = (user_id, role)
+    return found
+
+
+def _import_users(db: Session, entries: list, errors: list) -> schemas.UserImportResult:
+    """
+    Validates, hashes and inserts a batch of (index, UserImport) entries.
+    Managers referenced by manager_email may be created in the same batch: users are
+    inserted level by level so that every manager row exists before its reports.
+    """
+    if len(entries) + len(errors) > MAX_IMPORT_SIZE:
+        raise HTTPException(status_code=413, detail=f"An import can contain at most {MAX_IMPORT_SIZE} users")
+
+    def fail(index, detail):
+        errors.append(schemas.BatchRowError(index=index, detail=detail))
+
+    candidates = {}
+    for index, entry in entries:
+        email = auth.normalize_email(entry.email or "")
+        if not entry.name or not entry.name.strip():
+            fail(index, "Name is required")
+        elif not email:
+            fail(index, "Email is required")
+        elif not entry.password or len(entry.password) < 6:
+            fail(index, "Password must be at least 6 characters")
+        elif entry.role not in VALID_ROLES:
+            fail(index, f"Role must be one of: {', '.join(VALID_ROLES)}")
+        elif email in candidates:
+            fail(index, "Duplicate email in import")
+        else:
+            candidates[email] = (index, entry)
+
+    for email in _users_by_email(db, candidates):
+        fail(candidates.pop(email)[0], "Email already registered")
+
+    # Resolve manager references against existing users and the batch itself
+    referenced = {auth.normalize_email(e.manager_email) for _, e in candidates.values() if e.manager_email}
+    existing_managers = {
+        email: user_id for email, (user_id, role) in _users_by_email(db, referenced - set(candidates)).items()
+        if role == "Manager"
+    }
+    manager_ids = list({e.manager_id for _, e in candidates.values() if e.manager_id and not e.manager_email})
+    valid_manager_ids = set()
+    for chunk in _chunks(manager_ids):
+        valid_manager_ids.update(
+            user_id for (user_id,) in db.query(models.User.id).filter(models.User.id.in_(chunk), models.User.role == "Manager")
+        )
+
+    parents = {}
+    for email, (index, entry) in list(candidates.items()):
+        manager_email = auth.normalize_email(entry.manager_email) if entry.manager_email else None
+        if manager_email and manager_email in candidates and candidates[manager_email][1].role == "Manager":
+            parents[email] = manager_email
+        elif manager_email and manager_email in existing_managers:
+            entry.manager_id = existing_managers[manager_email]
+        elif manager_email or (entry.manager_id and entry.manager_id not in valid_manager_ids):
+            fail(candidates.pop(email)[0], "Manager not found or specified user is not a manager")
+
+    # Order the batch so that managers are inserted before their reports
+    levels, placed = [], set()
+    remaining = set(candidates)
+    while remaining:
+        level = [email for email in remaining if email not in parents or parents[email] in placed]
+        if not level:
+            break
+        levels.append(level)
+        placed.update(level)
+        remaining.difference_update(level)
+    for email in remaining:
+        fail(candidates[email][0], "Manager in the same import could not be created")
+
+    ordered = [email for level in levels for email in level]
+    hashes = dict(zip(ordered, hashing.hash_passwords([candidates[email][1].password for email in ordered])))
+
+    ids = {}
+    created = []
+    for level in levels:
+        for chunk in _chunks(level):
+            rows = []
+            for email in chunk:
+                entry = candidates[email][1]
+                rows.append({
+                    "name": entry.name.strip(),
+                    "email": email,
+                    "password_hash": hashes[email],
+                    "role": entry.role,
+                    "department": entry.department,
+                    "manager_id": ids[parents[email]] if email in parents else entry.manager_id,
+                    "is_active": True,
+                })
+            db.execute(insert(models.User), rows)
+            for user_id, email in db.query(models.User.id, models.User.email).filter(models.User.email.in_(chunk)):
+                ids[email] = user_id
+            created.extend((ids[row["email"]], row["manager_id"]) for row in rows)
+
+    if created:
+        summaries.record_users(db, created)
+        hierarchy.add_users(db, created)
+        db.commit()
+
+    errors.sort(key=lambda error: error.index)
+    return schemas.UserImportResult(created=len(created), errors=errors)
+
+
+@router.post("/import", response_model=schemas.UserImportResult)
+def import_users(batch: schemas.UserImportBatch, db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can import users. Valid rows are created, invalid rows are reported by position.
+    return _import_users(db, list(enumerate(batch.users)), [])
+
+
+@router.post("/import/csv", response_model=schemas.UserImportResult)
+def import_users_csv(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Same as /import, from a CSV with a header row of name, email, password and optionally
+    # role, department, manager_id and manager_email. Errors are reported by data row, from 0.
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig"))
+    missing = {"name", "email", "password"} - set(reader.fieldnames or [])
+    if missing:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"CSV is missing columns: {', '.join(sorted(missing))}")
+
+    entries, errors = [], []
+    for index, row in enumerate(reader):
+        try:
+            entries.append((index, schemas.UserImport(**{key: value for key, value in row.items() if key and value})))
+        except ValidationError:
+            errors.append(schemas.BatchRowError(index=index, detail="Invalid or missing fields"))
+    return _import_users(db, entries, errors)
+
+
+def _check_reporting_line(db: Session, user_id: int, manager_id: int) -> None:
+    # A user can't report to themselves or to anyone in their own org
+    if manager_id == user_id or hierarchy.is_in_org(db, manager_id, user_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A user cannot report to someone in their own org")
+
+
+def _apply_user_update(db: Session, user_id: int, user_in: schemas.UserUpdate, password_hash: Optional[str]) -> models.User:
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         
+    old_manager_id = user.manager_id
+    old_department = user.department
     update_data = user_in.dict(exclude_unset=True)
+    if update_data.get("email"):
+        update_data["email"] = auth.normalize_email(update_data["email"])
+        if _email_taken(db, update_data["email"], exclude_id=user_id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    if update_data.get("manager_id") and update_data["manager_id"] != old_manager_id:
+        _check_reporting_line(db, user_id, update_data["manager_id"])
     for key, value in update_data.items():
         setattr(user, key, value)
 
-    if user_in.password:
-        from ..auth import get_password_hash
-        user.password_hash = get_password_hash(user_in.password)
+    if password_hash:
+        user.password_hash = password_hash
 
+    summaries.record_manager_change(db, old_manager_id, user.manager_id)
+    if user.manager_id != old_manager_id:
+        hierarchy.move_user(db, user_id, user.manager_id)
+    if user.department != old_department:
+        db.flush()
+        leaderboard.refresh_totals(db, [user_id])
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
     return user
 
 
+@router.put("/{user_id}", response_model=schemas.UserOut)
+async def update_user(user_id: int, user_in: schemas.UserUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can update user information
+    password_hash = await hashing.hash_password(user_in.password) if user_in.password else None
+    return await run_in_threadpool(_apply_user_update, db, user_id, user_in, password_hash)
+
+
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
     # Only admins can delete users
@@ -64,8 +289,12 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: model
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         
+    summaries.forget_user(db, user)
+    leaderboard.forget_user(db, user_id)
+    hierarchy.remove_user(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
     return {"detail": "User deleted successfully"}
 
 
@@ -79,9 +308,15 @@ def assign_manager(user_id: int, manager_id: int, db: Session = Depends(get_db),
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if not manager:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Manager not found or specified user is not a manager")
-        
+    _check_reporting_line(db, user_id, manager_id)
+
+    old_manager_id = user.manager_id
     user.manager_id = manager_id
+    summaries.record_manager_change(db, old_manager_id, manager_id)
+    if manager_id != old_manager_id:
+        hierarchy.move_user(db, user_id, manager_id)
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
     return user
 
@@ -95,6 +330,7 @@ def activate_user(user_id: int, db: Session = Depends(get_db), current_user: mod
         
     user.is_active = True
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
     return user
 
@@ -108,65 +344,52 @@ def deactivate_user(user_id: int, db: Session = Depends(get_db), current_user: m
         
     user.is_active = False
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
     return user
 
 
-# Dashboard endpoints are now role-protected
+# Dashboard endpoints are now role-protected, and async: they are served from the
+# async session (see get_async_db) so they don't occupy threadpool workers when DB_ASYNC is on.
 @router.get("/dashboard/admin", response_model=schemas.AdminDashboard)
-def dashboard_admin(db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
-    total_employees = db.query(models.User).count()
-    # ... (rest of the dashboard logic remains the same)
-    avg_score = db.query(models.PerformanceReview).with_entities(models.PerformanceReview.rating).all()
-    ratings = [r[0] for r in avg_score if r[0] is not None]
-    avg = sum(ratings) / len(ratings) if ratings else 0
-    feedback_count = db.query(models.Feedback).count()
-    latest = db.query(models.PerformanceReview).order_by(models.PerformanceReview.created_at.desc()).first()
-    latest_rating = latest.rating if latest else None
-    kpi_total = db.query(models.KPIResult).count()
-    kpi_achieved = db.query(models.KPIResult).filter(models.KPIResult.status == "Achieved").count()
-    kpi_percent = (kpi_achieved / kpi_total * 100) if kpi_total else 0
-    
-    return {
-        "total_employees": total_employees, 
-        "average_performance": avg, 
-        "feedback_count": feedback_count, 
-        "latest_rating": latest_rating, 
-        "kpi_achievement_percent": kpi_percent
-    }
+async def dashboard_admin(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(require_admin)):
+    return await db.run_sync(dashboard.admin_summary)
 
 
 @router.get("/dashboard/manager", response_model=schemas.ManagerDashboard)
-def dashboard_manager(db: Session = Depends(get_db), current_user: models.User = Depends(require_manager)):
-    # ... (rest of the dashboard logic remains the same)
-    team = db.query(models.User).filter(models.User.manager_id == current_user.id).all()
-    team_ids = [u.id for u in team]
-    reviews = db.query(models.PerformanceReview).filter(models.PerformanceReview.employee_id.in_(team_ids)).all()
-    avg = sum([r.rating for r in reviews if r.rating is not None]) / len([r for r in reviews if r.rating is not None]) if reviews else 0
-    feedback_count = db.query(models.Feedback).filter(models.Feedback.to_user_id.in_(team_ids)).count()
-    latest = db.query(models.PerformanceReview).filter(models.PerformanceReview.employee_id.in_(team_ids)).order_by(models.PerformanceReview.created_at.desc()).first()
-    latest_rating = latest.rating if latest else None
-    
-    return {
-        "team_size": len(team), 
-        "average_performance": avg, 
-        "feedback_count": feedback_count, 
-        "latest_rating": latest_rating
-    }
+async def dashboard_manager(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(require_manager)):
+    return await db.run_sync(dashboard.manager_summary, current_user.id)
 
 
 @router.get("/dashboard/employee", response_model=schemas.EmployeeDashboard)
-def dashboard_employee(db: Session = Depends(get_db), current_user: models.User = Depends(require_employee)):
-    # ... (rest of the dashboard logic remains the same)
-    reviews = db.query(models.PerformanceReview).filter(models.PerformanceReview.employee_id == current_user.id).all()
-    avg = sum([r.rating for r in reviews if r.rating is not None]) / len([r for r in reviews if r.rating is not None]) if reviews else 0
-    feedback_count = db.query(models.Feedback).filter(models.Feedback.to_user_id == current_user.id).count()
-    latest = db.query(models.PerformanceReview).filter(models.PerformanceReview.employee_id == current_user.id).order_by(models.PerformanceReview.created_at.desc()).first()
-    latest_rating = latest.rating if latest else None
-    
-    return {
-        "average_performance": avg,
-        "feedback_count": feedback_count,
-        "latest_rating": latest_rating,
-        "reviews": reviews
-    }
+async def dashboard_employee(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(require_employee)):
+    return await db.run_sync(dashboard.employee_dashboard, current_user.id)
+
+
+@router.get("/dashboard/org", response_model=schemas.OrgDashboard)
+async def dashboard_org(
+    manager_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(require_manager)
+):
+    # Figures for everyone below a manager at any depth. Managers see their own org,
+    # admins may pass any manager_id.
+    if manager_id is None or current_user.role != "Admin":
+        manager_id = current_user.id
+    return await db.run_sync(dashboard.org_summary, manager_id)
+
+
+@router.post("/dashboard/rebuild")
+def rebuild_dashboard_summaries(db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can recompute the materialized dashboard summaries from scratch
+    written = summaries.rebuild(db)
+    db.commit()
+    return {"detail": "Dashboard summaries rebuilt", "rows": written}
+
+
+@router.post("/hierarchy/rebuild")
+def rebuild_org_hierarchy(db: Session = Depends(get_db), current_user: models.User = Depends(require_admin)):
+    # Only admins can recompute the org hierarchy index from users.manager_id
+    written = hierarchy.rebuild(db)
+    db.commit()
+    return {"detail": "Org hierarchy rebuilt", "rows": written}
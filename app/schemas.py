@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 
 class Token(BaseModel):
@@ -13,6 +13,11 @@ class TokenData(BaseModel):
     role: Optional[str] = None
 
 
+class BatchRowError(BaseModel):
+    index: int
+    detail: str
+
+
 class UserBase(BaseModel):
     name: str
     email: str  # Changed from EmailStr to str for more flexibility
@@ -25,6 +30,20 @@ class UserCreate(UserBase):
     manager_id: Optional[int] = None
 
 
+class UserImport(UserCreate):
+    # Alternative to manager_id; may reference a manager created in the same batch
+    manager_email: Optional[str] = None
+
+
+class UserImportBatch(BaseModel):
+    users: List[UserImport]
+
+
+class UserImportResult(BaseModel):
+    created: int
+    errors: List[BatchRowError]
+
+
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[str] = None
@@ -39,6 +58,7 @@ class UserUpdate(BaseModel):
 class UserOut(UserBase):
     id: int
     role: str
+    manager_id: Optional[int] = None
     is_active: bool
     created_at: datetime
 
@@ -62,6 +82,10 @@ class PerformanceOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ReviewSearchHit(PerformanceOut):
+    rank: float
+
+
 class FeedbackCreate(BaseModel):
     to_user_id: int
     message: str
@@ -76,10 +100,25 @@ class FeedbackOut(BaseModel):
     is_anonymous: bool
     status: str
     created_at: datetime
+    moderation_score: Optional[float] = None
+    moderation_flags: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class FeedbackSearchHit(FeedbackOut):
+    rank: float
+
+
+class FeedbackBulkAction(BaseModel):
+    ids: List[int]
+
+
+class FeedbackBulkResult(BaseModel):
+    updated: int
+    not_found: List[int]
+
+
 class KPICreate(BaseModel):
     title: str
     target: float
@@ -103,6 +142,15 @@ class KPIEvaluate(BaseModel):
     achieved_value: float
 
 
+class KPIBatchEvaluate(BaseModel):
+    evaluations: List[KPIEvaluate]
+
+
+class KPIBatchResult(BaseModel):
+    created: int
+    errors: List[BatchRowError]
+
+
 class KPIResultBase(BaseModel):
     kpi_id: int
     employee_id: int
@@ -139,12 +187,14 @@ class ManagerDashboard(BaseModel):
     team_size: int
     average_performance: float
     feedback_count: int
+    pending_feedback: int = 0
     latest_rating: Optional[float] = None
 
 
 class EmployeeDashboard(BaseModel):
     average_performance: float
     feedback_count: int
+    pending_feedback: int = 0
     latest_rating: Optional[float] = None
     reviews: List[PerformanceOut]
 
@@ -153,6 +203,7 @@ class AdminDashboard(BaseModel):
     total_employees: int
     average_performance: float
     feedback_count: int
+    pending_feedback: int = 0
     latest_rating: Optional[float] = None
     kpi_achievement_percent: float
 
@@ -161,4 +212,69 @@ class ManagerDashboard(BaseModel):
     team_size: int
     average_performance: float
     feedback_count: int
+    pending_feedback: int = 0
+    latest_rating: Optional[float] = None
+
+
+class OrgDashboard(BaseModel):
+    manager_id: int
+    org_size: int
+    levels: int
+    average_performance: float
+    feedback_count: int
+    pending_feedback: int = 0
     latest_rating: Optional[float] = None
+    kpi_achievement_percent: float
+
+
+class TimeSeriesPoint(BaseModel):
+    period: date
+    review_count: int
+    average_rating: Optional[float] = None
+    feedback_count: int
+    kpi_total: int
+    kpi_achievement_percent: Optional[float] = None
+
+
+class TimeSeries(BaseModel):
+    scope: str
+    key: Optional[str] = None
+    bucket: str
+    start: date
+    end: date
+    points: List[TimeSeriesPoint]
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    employee_id: int
+    name: str
+    department: Optional[str] = None
+    score: float
+
+
+class Leaderboard(BaseModel):
+    scope: str
+    key: Optional[str] = None
+    total: int
+    entries: List[LeaderboardEntry]
+
+
+class KPIStanding(BaseModel):
+    kpi_id: int
+    title: str
+    score: float
+    rank: int
+    percentile: float
+    total: int
+
+
+class EmployeeStanding(BaseModel):
+    employee_id: int
+    department: Optional[str] = None
+    total_score: float
+    kpi_count: int
+    department_rank: Optional[int] = None
+    department_percentile: Optional[float] = None
+    department_size: int
+    kpis: List[KPIStanding]
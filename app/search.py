@@ -0,0 +1,169 @@
+"""
+Full-text search over feedback messages and review comments.
+
+On PostgreSQL the text columns are matched with ``to_tsvector('english', ...)``
+against a ``websearch_to_tsquery``, served by the GIN expression indexes of
+migration 0007 and ranked with ``ts_rank_cd``. On SQLite they are matched
+through the FTS5 tables of the same migration and ranked with ``bm25``. Both
+indexes follow inserts, updates and deletes by themselves: PostgreSQL
+maintains the expression indexes, and on SQLite triggers update the FTS5 tables.
+
+Queries are plain words, all of which must match (stemmed, so "pipelines"
+finds "pipeline"), and "quoted phrases". Both backends get the same terms
+from ``parse_query``: there are no operators, so "or" and "-word" are just
+words. The one difference is that PostgreSQL ignores English stopwords.
+Results are ordered by relevance and paginated with a (rank, id) keyset cursor.
+"""
+import re
+from typing import NamedTuple, Optional
+from fastapi import HTTPException
+from sqlalchemy import and_, column, func, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+from . import models
+from .pagination import NEXT_CURSOR_HEADER, PageParams, decode_cursor, encode_cursor
+
+# Text search configuration of the PostgreSQL indexes; must match migration 0007
+TS_CONFIG = "english"
+# Longest accepted query
+MAX_QUERY_LENGTH = 200
+
+
+class Source(NamedTuple):
+    model: type
+    column: str         # indexed text column
+    user_column: str    # the user a row is about, for the user and department filters
+
+
+SOURCES = {
+    "feedback": Source(models.Feedback, "message", "to_user_id"),
+    "reviews": Source(models.PerformanceReview, "comments", "employee_id"),
+}
+
+# Same statements as migration 0007
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+        {column}, content='{table}', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts (rowid, {column}) VALUES (new.id, new.{column});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {column} ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+        INSERT INTO {table}_fts (rowid, {column}) VALUES (new.id, new.{column});
+    END""",
+    "INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')",
+]
+
+_TOKEN = re.compile(r'"([^"]*)"|(\w+)')
+
+
+def parse_query(q: str) -> list:
+    """The words and quoted phrases of a search query, each as a list of words."""
+    terms = []
+    for phrase, word in _TOKEN.findall(q):
+        words = re.findall(r"\w+", phrase or word)
+        if words:
+            terms.append(words)
+    return terms
+
+
+def _fts5_query(terms: list) -> str:
+    # Every word is quoted, so FTS5 operators and column filters in the input have no effect
+    return " AND ".join('"' + " ".join(words) + '"' for words in terms)
+
+
+def _fts_table(source: Source):
+    return table(f"{source.model.__tablename__}_fts", column("rowid"))
+
+
+def _match(db: Session, source: Source, q: str, query):
+    """Restricts ``query`` to rows of ``source`` matching ``q``; returns it with a rank expression (higher is better)."""
+    terms = parse_query(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="The search query must contain at least one word")
+    model = source.model
+    if db.get_bind().dialect.name == "sqlite":
+        fts = _fts_table(source)
+        query = query.join(fts, fts.c.rowid == model.id).where(literal_column(fts.name).op("MATCH")(_fts5_query(terms)))
+        return query, -func.bm25(literal_column(fts.name))
+    # Spelled out as literals, so the expression is identical to the indexed one
+    config = literal_column(f"'{TS_CONFIG}'::regconfig")
+    vector = func.to_tsvector(config, func.coalesce(getattr(model, source.column), literal_column("''")))
+    tsquery = None
+    for words in terms:
+        phrase = func.phraseto_tsquery(config, " ".join(words))
+        tsquery = phrase if tsquery is None else tsquery.op("&&")(phrase)
+    return query.where(vector.op("@@")(tsquery)), func.ts_rank_cd(vector, tsquery)
+
+
+def search(
+    db: Session,
+    source: Source,
+    q: str,
+    columns: tuple,
+    page: PageParams,
+    user_id: Optional[int] = None,
+    department: Optional[str] = None,
+    created_after=None,
+    created_before=None,
+) -> list:
+    """
+    One page of the rows of ``source`` matching ``q``, best first, as ``columns`` plus a
+    ``rank`` column. The next-page cursor is set on ``page.response``.
+    """
+    if len(q) > MAX_QUERY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"The search query can be at most {MAX_QUERY_LENGTH} characters")
+    model = source.model
+    query, rank = _match(db, source, q, select(*columns).select_from(model))
+    query = query.add_columns(rank.label("rank"))
+    user_column = getattr(model, source.user_column)
+    if user_id is not None:
+        query = query.where(user_column == user_id)
+    if department is not None:
+        query = query.join(models.User, models.User.id == user_column).where(models.User.department == department)
+    if created_after is not None:
+        query = query.where(model.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(model.created_at < created_before)
+
+    ranked = select(query.subquery())
+    row = ranked.selected_columns
+    if page.cursor:
+        values = decode_cursor(page.cursor)
+        try:
+            last_rank, last_id = float(values[0]), int(values[1])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        ranked = ranked.where(or_(row.rank < last_rank, and_(row.rank == last_rank, row.id < last_id)))
+    rows = db.execute(ranked.order_by(row.rank.desc(), row.id.desc()).limit(page.limit + 1)).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        page.response.headers[NEXT_CURSOR_HEADER] = encode_cursor([rows[-1].rank, rows[-1].id])
+    return rows
+
+
+def rebuild(db: Session) -> None:
+    """
+    Recreates any missing SQLite FTS5 table or trigger and re-reads every row into
+    the FTS5 tables. PostgreSQL maintains its indexes itself and needs no rebuild.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    for source in SOURCES.values():
+        for statement in SQLITE_DDL:
+            db.execute(text(statement.format(table=source.model.__tablename__, column=source.column)))
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+        print("✓ Rebuilt the full-text search indexes")
+    finally:
+        db.close()
@@ -0,0 +1,254 @@
+"""
+Sample data for development and demos.
+
+    python -m app.seed            # create whatever sample data is missing
+    python -m app.seed --seed 7   # reproducible random choices
+
+Seeding is idempotent: each entity type is checked with a single query and
+only the missing rows are bulk-inserted, so it is safe to run on every deploy.
+Passwords are hashed once per distinct password, and only for users that
+do not exist yet. The app itself no longer seeds on startup unless
+SEED_SAMPLE_DATA=true.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+from . import models, summaries, hierarchy, analytics, leaderboard, hashing
+
+# (name, email, password, role, department)
+ADMINS = [
+    ("Admin User", "admin@example.com", "adminpass", "Admin", "HR"),
+    ("Super Admin", "admin2@example.com", "adminpass2", "Admin", "IT"),
+]
+MANAGERS = [
+    ("Manager User", "manager@example.com", "managerpass", "Manager", "Sales"),
+    ("Senior Manager", "manager2@example.com", "managerpass2", "Manager", "Engineering"),
+]
+EMPLOYEES = [
+    (name, email, "password123", "Employee", dept)
+    for name, email, dept in [
+        ("John Smith", "john.smith@example.com", "Engineering"),
+        ("Sarah Johnson", "sarah.johnson@example.com", "Marketing"),
+        ("Michael Chen", "michael.chen@example.com", "Engineering"),
+        ("Emma Wilson", "emma.wilson@example.com", "HR"),
+        ("David Brown", "david.brown@example.com", "Sales"),
+        ("Lisa Anderson", "lisa.anderson@example.com", "Product"),
+        ("James Miller", "james.miller@example.com", "Engineering"),
+        ("Rachel Davis", "rachel.davis@example.com", "Marketing"),
+        ("Peter Jones", "peter.jones@example.com", "Sales"),
+        ("Olivia Garcia", "olivia.garcia@example.com", "Product"),
+    ]
+]
+
+KPIS = [
+    {"title": "Sales Target", "target": 100000.0, "weightage": 1.5, "department": "Sales"},
+    {"title": "Code Quality Score", "target": 95.0, "weightage": 1.0, "department": "Engineering"},
+    {"title": "Customer Satisfaction", "target": 90.0, "weightage": 1.2, "department": None},
+    {"title": "Project Completion Rate", "target": 100.0, "weightage": 1.0, "department": None},
+    {"title": "Team Engagement Score", "target": 85.0, "weightage": 0.8, "department": None},
+    {"title": "Marketing Campaign ROI", "target": 300.0, "weightage": 1.3, "department": "Marketing"},
+]
+
+REVIEW_COMMENTS = [
+    "Great performance! Keep it up.",
+    "Good work overall. Minor improvements needed.",
+    "Excellent contribution to the team.",
+    "Solid performer with strong potential.",
+    "Meeting expectations. Continue development.",
+    "Outstanding work this quarter!",
+]
+FEEDBACK_MESSAGES = [
+    "Great teamwork on the recent project!",
+    "Your communication skills are excellent.",
+    "Keep up the good work!",
+    "Your attention to detail is appreciated.",
+    "Excellent problem-solving abilities.",
+    "Great initiative and leadership!",
+    "Very collaborative and supportive colleague.",
+    "Outstanding technical skills demonstrated.",
+]
+SAMPLE_FEEDBACK_COUNT = 10
+RESULTS_PER_KPI = 3
+
+
+def _seed_users(db: Session, rng: random.Random) -> Tuple[dict, int]:
+    """Creates the missing sample users; returns {email: User} for all of them and the number created."""
+    people = ADMINS + MANAGERS + EMPLOYEES
+    users = {
+        user.email: user
+        for user in db.scalars(select(models.User).where(models.User.email.in_([p[1] for p in people])))
+    }
+    missing = [p for p in people if p[1] not in users]
+    if not missing:
+        return users, 0
+
+    passwords = sorted({p[2] for p in missing})
+    hashes = dict(zip(passwords, hashing.hash_passwords(passwords)))
+
+    def build(name, email, password, role, department, manager_id=None):
+        return models.User(
+            name=name, email=email, password_hash=hashes[password], role=role,
+            department=department, manager_id=manager_id, is_active=True,
+        )
+
+    # Admins and managers first, so employees can reference the managers' ids
+    leads = [build(*p) for p in missing if p[3] != "Employee"]
+    db.add_all(leads)
+    db.flush()
+    users.update((user.email, user) for user in leads)
+
+    manager_ids = [users[p[1]].id for p in MANAGERS]
+    employees = [build(*p, manager_id=rng.choice(manager_ids)) for p in missing if p[3] == "Employee"]
+    db.add_all(employees)
+    db.flush()
+    users.update((user.email, user) for user in employees)
+    return users, len(missing)
+
+
+def _seed_reviews(db: Session, rng: random.Random, employees: list) -> int:
+    """One review per employee by their manager."""
+    review = models.PerformanceReview
+    reviewed = set(db.execute(
+        select(review.employee_id, review.manager_id).where(review.employee_id.in_([e.id for e in employees]))
+    ).tuples())
+    now = datetime.utcnow()
+    rows = [
+        {
+            "employee_id": employee.id,
+            "manager_id": employee.manager_id,
+            "rating": round(rng.uniform(2.5, 5.0), 1),
+            "comments": rng.choice(REVIEW_COMMENTS),
+            "created_at": now - timedelta(days=rng.randint(1, 30)),
+        }
+        for employee in employees
+        if employee.manager_id and (employee.id, employee.manager_id) not in reviewed
+    ]
+    if rows:
+        db.execute(insert(review), rows)
+    return len(rows)
+
+
+def _seed_feedback(db: Session, rng: random.Random, employees: list) -> int:
+    """Tops the feedback exchanged between sample employees up to SAMPLE_FEEDBACK_COUNT entries."""
+    ids = [e.id for e in employees]
+    if len(ids) < 2:
+        return 0
+    pairs = set(db.execute(
+        select(models.Feedback.from_user_id, models.Feedback.to_user_id)
+        .where(models.Feedback.from_user_id.in_(ids), models.Feedback.to_user_id.in_(ids))
+    ).tuples())
+    candidates = [(a, b) for a in ids for b in ids if a != b and (a, b) not in pairs]
+    needed = max(0, SAMPLE_FEEDBACK_COUNT - len(pairs))
+    now = datetime.utcnow()
+    rows = []
+    for from_id, to_id in rng.sample(candidates, min(needed, len(candidates))):
+        created_at = now - timedelta(days=rng.randint(1, 60))
+        rows.append({
+            "from_user_id": from_id,
+            "to_user_id": to_id,
+            "message": rng.choice(FEEDBACK_MESSAGES),
+            "is_anonymous": rng.choice([True, False]),
+            "status": "approved",
+            "created_at": created_at,
+            "moderated_at": created_at,
+        })
+    if rows:
+        db.execute(insert(models.Feedback), rows)
+    return len(rows)
+
+
+def _seed_kpis(db: Session) -> Tuple[list, int]:
+    """Creates the missing sample KPIs; returns all of them and the number created."""
+    titles = [k["title"] for k in KPIS]
+    existing = set(db.scalars(select(models.KPI.title).where(models.KPI.title.in_(titles))))
+    rows = [k for k in KPIS if k["title"] not in existing]
+    if rows:
+        db.execute(insert(models.KPI), rows)
+    return list(db.scalars(select(models.KPI).where(models.KPI.title.in_(titles)))), len(rows)
+
+
+def _seed_kpi_results(db: Session, rng: random.Random, kpis: list, employees: list) -> int:
+    """Gives every sample KPI results for RESULTS_PER_KPI sample employees."""
+    ids = [e.id for e in employees]
+    if not ids:
+        return 0
+    evaluated = {}
+    for kpi_id, employee_id in db.execute(
+        select(models.KPIResult.kpi_id, models.KPIResult.employee_id)
+        .where(models.KPIResult.kpi_id.in_([k.id for k in kpis]), models.KPIResult.employee_id.in_(ids))
+    ):
+        evaluated.setdefault(kpi_id, set()).add(employee_id)
+
+    now = datetime.utcnow()
+    rows = []
+    for kpi in kpis:
+        done = evaluated.get(kpi.id, set())
+        remaining = [i for i in ids if i not in done]
+        for employee_id in rng.sample(remaining, min(max(0, RESULTS_PER_KPI - len(done)), len(remaining))):
+            achieved_value = kpi.target * rng.uniform(0.7, 1.1)
+            percent = (achieved_value / kpi.target) if kpi.target else 0
+            status = "Achieved" if percent >= 1 else ("Partial" if percent > 0 else "Not Achieved")
+            rows.append({
+                "kpi_id": kpi.id,
+                "employee_id": employee_id,
+                "achieved_value": round(achieved_value, 2),
+                "status": status,
+                "score": round(percent * kpi.weightage * 100, 2),
+                "created_at": now - timedelta(days=rng.randint(1, 30)),
+            })
+    if rows:
+        db.execute(insert(models.KPIResult), rows)
+    return len(rows)
+
+
+def seed(db: Session, seed_value: Optional[int] = None) -> dict:
+    """
+    Creates any missing sample data and rebuilds the summaries, rollups, leaderboards and org hierarchy.
+    Returns the number of rows created per entity. The caller commits.
+    """
+    rng = random.Random(seed_value)
+    users, created_users = _seed_users(db, rng)
+    employees = [users[p[1]] for p in EMPLOYEES]
+    kpis, created_kpis = _seed_kpis(db)
+    created = {
+        "users": created_users,
+        "kpis": created_kpis,
+        "reviews": _seed_reviews(db, rng, employees),
+        "feedback": _seed_feedback(db, rng, employees),
+        "kpi_results": _seed_kpi_results(db, rng, kpis, employees),
+    }
+    if any(created.values()):
+        # Sample data is inserted directly, bypassing the incremental summary updates.
+        summaries.rebuild(db)
+        analytics.rebuild(db)
+        leaderboard.rebuild(db)
+    if created_users:
+        hierarchy.rebuild(db)
+    return created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create the sample users, reviews, feedback and KPIs")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible sample data")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        created = seed(db, args.seed)
+        db.commit()
+        print(f"✓ Sample data ready ({', '.join(f'{count} {name}' for name, count in created.items())} created)")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        hashing.shutdown()
+
+
+if __name__ == "__main__":
+    main()
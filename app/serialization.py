@@ -0,0 +1,44 @@
+"""
+Fast JSON rendering for the list endpoints.
+
+Responses are encoded with orjson: ``ORJSONResponse`` is the app's default
+response class. The list endpoints additionally skip the ORM entirely. They
+``select_columns`` of the response schema, so rows come back as plain tuples
+with no identity-map or attribute-instrumentation overhead, and
+``list_response`` validates and encodes a whole page with one ``TypeAdapter``
+call in pydantic-core. Otherwise FastAPI would validate each ORM object,
+convert it back to Python data and run that through a separate JSON encoder.
+"""
+from functools import lru_cache
+from typing import List, Optional, Type
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from .pagination import NEXT_CURSOR_HEADER, PageParams
+
+
+@lru_cache(maxsize=None)
+def _columns(schema: Type[BaseModel], model) -> tuple:
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def select_columns(schema: Type[BaseModel], model) -> tuple:
+    """The columns of ``model`` named by the fields of ``schema``, for ``db.query(*columns)``."""
+    return _columns(schema, model)
+
+
+def list_response(schema: Type[BaseModel], rows: list, page: Optional[PageParams] = None) -> Response:
+    """
+    Serializes rows (tuples from ``select_columns`` or ORM objects) as a JSON array of
+    ``schema``. The next-page cursor set by ``page`` is carried over to the response.
+    """
+    adapter = _list_adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    headers = {}
+    if page is not None and NEXT_CURSOR_HEADER in page.response.headers:
+        headers[NEXT_CURSOR_HEADER] = page.response.headers[NEXT_CURSOR_HEADER]
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,346 @@
+"""
+Materialized dashboard summaries.
+
+The write endpoints call the ``record_*`` helpers inside their own transaction,
+so the ``dashboard_summaries`` rows are kept up to date with single UPDATE
+statements and dashboards become primary-key reads. ``rebuild`` recomputes
+every row from scratch with grouped queries; run it with ``python -m app.summaries``
+or ``POST /api/users/dashboard/rebuild`` after bulk data changes.
+"""
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import select, update, delete, insert, func, case, and_, or_, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+
+GLOBAL = "global"
+USER = "user"
+MANAGER = "manager"
+
+Summary = models.DashboardSummary
+Key = Tuple[str, int]
+
+COUNTERS = (
+    "member_count", "review_count", "rating_count", "rating_sum",
+    "feedback_count", "pending_feedback_count", "kpi_total", "kpi_achieved",
+)
+
+
+def _empty_row(scope: str, owner_id: int) -> dict:
+    row = {name: 0 for name in COUNTERS}
+    row.update(scope=scope, owner_id=owner_id, rating_sum=0.0, latest_rating=None, latest_review_at=None)
+    if scope == USER:
+        row["member_count"] = 1
+    return row
+
+
+def _match(keys: Iterable[Key]):
+    return or_(*[and_(Summary.scope == scope, Summary.owner_id == owner_id) for scope, owner_id in keys])
+
+
+def _ensure(db: Session, keys: Iterable[Key]) -> None:
+    """Creates any missing summary rows for the given keys."""
+    keys = list(keys)
+    owners_by_scope = {}
+    for scope, owner_id in keys:
+        owners_by_scope.setdefault(scope, []).append(owner_id)
+    existing = set()
+    for scope, owner_ids in owners_by_scope.items():
+        existing.update(db.execute(
+            select(Summary.scope, Summary.owner_id).where(Summary.scope == scope, Summary.owner_id.in_(owner_ids))
+        ).tuples())
+    missing = [_empty_row(scope, owner_id) for scope, owner_id in dict.fromkeys(keys) if (scope, owner_id) not in existing]
+    if not missing:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(Summary), missing)
+    except IntegrityError:
+        # Another request created some of the rows concurrently; insert the rest one by one.
+        for row in missing:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(Summary).values(**row))
+            except IntegrityError:
+                pass
+
+
+def _keys_for(db: Session, user_id: int) -> list:
+    """Summary rows affected by a change to the given user's data."""
+    keys = [(GLOBAL, 0), (USER, user_id)]
+    manager_id = db.scalar(select(models.User.manager_id).where(models.User.id == user_id))
+    if manager_id:
+        keys.append((MANAGER, manager_id))
+    return keys
+
+
+def _bump(db: Session, keys: list, deltas: dict, rating: Optional[float] = None, reviewed_at=None) -> None:
+    """Atomically adds ``deltas`` to the counters of every row in ``keys``."""
+    _ensure(db, keys)
+    values = {name: getattr(Summary, name) + delta for name, delta in deltas.items() if delta}
+    if rating is not None and reviewed_at is not None:
+        newer = or_(Summary.latest_review_at.is_(None), Summary.latest_review_at <= reviewed_at)
+        values["latest_rating"] = case((newer, rating), else_=Summary.latest_rating)
+        values["latest_review_at"] = case((newer, reviewed_at), else_=Summary.latest_review_at)
+    if not values:
+        return
+    db.execute(update(Summary).where(_match(keys)).values(**values).execution_options(synchronize_session=False))
+
+
+def record_review(db: Session, review: models.PerformanceReview) -> None:
+    """Adds a newly created (flushed) performance review to the summaries."""
+    rated = review.rating is not None
+    _bump(
+        db,
+        _keys_for(db, review.employee_id),
+        {"review_count": 1, "rating_count": int(rated), "rating_sum": review.rating if rated else 0},
+        rating=review.rating,
+        reviewed_at=review.created_at,
+    )
+
+
+def record_feedback(db: Session, feedback: models.Feedback, delta: int = 1) -> None:
+    """Adds (delta=1) or removes (delta=-1) a feedback entry from the summaries."""
+    pending = delta if feedback.status == "pending" else 0
+    _bump(db, _keys_for(db, feedback.to_user_id), {"feedback_count": delta, "pending_feedback_count": pending})
+
+
+def record_feedback_status(db: Session, feedback: models.Feedback, old_status: str) -> None:
+    """Adjusts the pending counters after a feedback entry was approved or rejected."""
+    delta = int(feedback.status == "pending") - int(old_status == "pending")
+    if delta:
+        _bump(db, _keys_for(db, feedback.to_user_id), {"pending_feedback_count": delta})
+
+
+def record_feedback_statuses(db: Session, changes: Iterable[Tuple[int, str, str]]) -> None:
+    """
+    Adjusts the pending counters after a batch of status changes, given as
+    (to_user_id, old_status, new_status) tuples, with a single executemany UPDATE.
+    """
+    per_user = {}
+    for to_user_id, old_status, new_status in changes:
+        delta = int(new_status == "pending") - int(old_status == "pending")
+        if delta:
+            per_user[to_user_id] = per_user.get(to_user_id, 0) + delta
+    if not per_user:
+        return
+    managers = dict(db.execute(
+        select(models.User.id, models.User.manager_id).where(models.User.id.in_(per_user))
+    ).tuples().all())
+    deltas = {}
+    for user_id, delta in per_user.items():
+        keys = [(GLOBAL, 0), (USER, user_id)] + ([(MANAGER, managers[user_id])] if managers.get(user_id) else [])
+        for key in keys:
+            deltas[key] = deltas.get(key, 0) + delta
+    _ensure(db, deltas)
+    table = Summary.__table__
+    db.execute(
+        update(table)
+        .where(table.c.scope == bindparam("key_scope"), table.c.owner_id == bindparam("key_owner"))
+        .values(pending_feedback_count=table.c.pending_feedback_count + bindparam("delta_pending")),
+        [
+            {"key_scope": scope, "key_owner": owner_id, "delta_pending": delta}
+            for (scope, owner_id), delta in deltas.items()
+        ],
+    )
+
+
+def record_kpi_result(db: Session, result: models.KPIResult) -> None:
+    """Adds a newly created KPI result to the summaries."""
+    _bump(db, _keys_for(db, result.employee_id), {"kpi_total": 1, "kpi_achieved": int(result.status == "Achieved")})
+
+
+def record_kpi_results(db: Session, results: Iterable[Tuple[int, Optional[int], bool]]) -> None:
+    """
+    Adds a batch of KPI results, given as (employee_id, manager_id, achieved) tuples.
+    Deltas are summed per summary row and applied with a single executemany UPDATE.
+    """
+    deltas = {}
+    for employee_id, manager_id, achieved in results:
+        keys = [(GLOBAL, 0), (USER, employee_id)] + ([(MANAGER, manager_id)] if manager_id else [])
+        for key in keys:
+            total, hits = deltas.get(key, (0, 0))
+            deltas[key] = (total + 1, hits + int(achieved))
+    if not deltas:
+        return
+    _ensure(db, deltas)
+    table = Summary.__table__
+    db.execute(
+        update(table)
+        .where(table.c.scope == bindparam("key_scope"), table.c.owner_id == bindparam("key_owner"))
+        .values(
+            kpi_total=table.c.kpi_total + bindparam("delta_total"),
+            kpi_achieved=table.c.kpi_achieved + bindparam("delta_achieved"),
+        ),
+        [
+            {"key_scope": scope, "key_owner": owner_id, "delta_total": total, "delta_achieved": hits}
+            for (scope, owner_id), (total, hits) in deltas.items()
+        ],
+    )
+
+
+def record_user(db: Session, user: models.User) -> None:
+    """Registers a newly created (flushed) user."""
+    record_users(db, [(user.id, user.manager_id)])
+
+
+def record_users(db: Session, users: Iterable[Tuple[int, Optional[int]]]) -> None:
+    """Registers a batch of newly created users, given as (user_id, manager_id) tuples."""
+    users = list(users)
+    if not users:
+        return
+    _ensure(db, [(USER, user_id) for user_id, _ in users])
+    _bump(db, [(GLOBAL, 0)], {"member_count": len(users)})
+    for manager_id in {manager_id for _, manager_id in users if manager_id}:
+        refresh_manager(db, manager_id)
+
+
+def record_manager_change(db: Session, old_manager_id: Optional[int], new_manager_id: Optional[int]) -> None:
+    """Recomputes the team rows of both managers after a user moved between teams."""
+    if old_manager_id == new_manager_id:
+        return
+    db.flush()
+    for manager_id in (old_manager_id, new_manager_id):
+        if manager_id:
+            refresh_manager(db, manager_id)
+
+
+def forget_user(db: Session, user: models.User) -> None:
+    """Removes a user that is about to be deleted from the summaries."""
+    db.execute(delete(Summary).where(_match([(USER, user.id), (MANAGER, user.id)])))
+    _bump(db, [(GLOBAL, 0)], {"member_count": -1})
+    if user.manager_id:
+        db.flush()
+        refresh_manager(db, user.manager_id, exclude_user_id=user.id)
+
+
+def refresh_manager(db: Session, manager_id: int, exclude_user_id: Optional[int] = None) -> None:
+    """Recomputes a manager's team row from the per-user rows of their direct reports."""
+    member = models.User.manager_id == manager_id
+    if exclude_user_id is not None:
+        member = and_(member, models.User.id != exclude_user_id)
+    joined = and_(Summary.scope == USER, Summary.owner_id == models.User.id)
+
+    totals = db.execute(
+        select(
+            func.count(models.User.id),
+            *[func.coalesce(func.sum(getattr(Summary, name)), 0) for name in COUNTERS[1:]],
+        ).select_from(models.User).outerjoin(Summary, joined).where(member)
+    ).one()
+    latest = db.execute(
+        select(Summary.latest_rating, Summary.latest_review_at)
+        .select_from(models.User).join(Summary, joined)
+        .where(member, Summary.latest_review_at.isnot(None))
+        .order_by(Summary.latest_review_at.desc())
+        .limit(1)
+    ).first()
+
+    values = dict(zip(COUNTERS, totals))
+    values["latest_rating"], values["latest_review_at"] = latest if latest else (None, None)
+    _ensure(db, [(MANAGER, manager_id)])
+    db.execute(
+        update(Summary).where(_match([(MANAGER, manager_id)])).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get(db: Session, scope: str, owner_id: int = 0) -> Optional[models.DashboardSummary]:
+    """Returns a single summary row, or None if it has not been materialized yet."""
+    return db.execute(
+        select(Summary).where(Summary.scope == scope, Summary.owner_id == owner_id)
+    ).scalar_one_or_none()
+
+
+def rebuild(db: Session) -> int:
+    """
+    Recomputes every summary row from the source tables with grouped queries.
+    Returns the number of rows written. The caller is responsible for committing.
+    """
+    rows = {}
+
+    def add(user_id, **values):
+        row = rows.setdefault(user_id, _empty_row(USER, user_id))
+        for name, value in values.items():
+            row[name] += value or 0
+
+    users = db.execute(select(models.User.id, models.User.manager_id)).all()
+    for user_id, _ in users:
+        add(user_id)
+
+    review = models.PerformanceReview
+    for employee_id, count, rated, total in db.execute(
+        select(review.employee_id, func.count(review.id), func.count(review.rating), func.sum(review.rating))
+        .group_by(review.employee_id)
+    ):
+        add(employee_id, review_count=count, rating_count=rated, rating_sum=total)
+
+    ranked = select(
+        review.employee_id, review.rating, review.created_at,
+        func.row_number().over(
+            partition_by=review.employee_id,
+            order_by=(review.created_at.desc(), review.id.desc()),
+        ).label("rn"),
+    ).where(review.rating.isnot(None)).subquery()
+    for employee_id, rating, created_at in db.execute(
+        select(ranked.c.employee_id, ranked.c.rating, ranked.c.created_at).where(ranked.c.rn == 1)
+    ):
+        add(employee_id)
+        rows[employee_id].update(latest_rating=rating, latest_review_at=created_at)
+
+    for to_user_id, count, pending in db.execute(
+        select(
+            models.Feedback.to_user_id,
+            func.count(models.Feedback.id),
+            func.sum(case((models.Feedback.status == "pending", 1), else_=0)),
+        ).group_by(models.Feedback.to_user_id)
+    ):
+        add(to_user_id, feedback_count=count, pending_feedback_count=pending)
+
+    for employee_id, count, achieved in db.execute(
+        select(
+            models.KPIResult.employee_id,
+            func.count(models.KPIResult.id),
+            func.sum(case((models.KPIResult.status == "Achieved", 1), else_=0)),
+        ).group_by(models.KPIResult.employee_id)
+    ):
+        add(employee_id, kpi_total=count, kpi_achieved=achieved)
+
+    managers = {}
+    for user_id, manager_id in users:
+        if not manager_id:
+            continue
+        team = managers.setdefault(manager_id, _empty_row(MANAGER, manager_id))
+        _merge(team, rows[user_id])
+
+    # Reviews, feedback and results of deleted users still count towards the global totals.
+    glob = _empty_row(GLOBAL, 0)
+    for row in rows.values():
+        _merge(glob, row)
+    glob["member_count"] = len(users)
+
+    db.execute(delete(Summary))
+    payload = [glob] + [rows[user_id] for user_id, _ in users] + list(managers.values())
+    db.execute(insert(Summary), payload)
+    return len(payload)
+
+
+def _merge(target: dict, source: dict) -> None:
+    for name in COUNTERS:
+        target[name] += source[name]
+    if source["latest_review_at"] is not None and (
+        target["latest_review_at"] is None or source["latest_review_at"] >= target["latest_review_at"]
+    ):
+        target["latest_rating"] = source["latest_rating"]
+        target["latest_review_at"] = source["latest_review_at"]
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        written = rebuild(db)
+        db.commit()
+        print(f"✓ Rebuilt {written} dashboard summary rows")
+    finally:
+        db.close()
@@ -0,0 +1,278 @@
+"""
+Synthetic large-organisation dataset for load and query benchmarks.
+
+    python -m benchmarks.datagen --users 100000 --reviews 2000000 --feedback 2000000 --kpi-results 3000000
+    python -m benchmarks.datagen --users 100000 --span 2     # ~17-level deep hierarchy
+    python -m benchmarks.datagen --reset ...                 # wipe the database first
+
+Targets the application database (USE_SQLITE / DATABASE_URL), applying the
+migrations first. Output is deterministic for a given --seed.
+
+The org is a tree in which every manager has ``span`` direct reports, filled
+breadth-first, so depth is about log_span(users). Users ``1..admins`` are
+Admins outside the tree. Every user is ``user<id>@bench.local`` with the
+password given by --password.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+from app import models
+
+INSERT_CHUNK_SIZE = 10000
+DEFAULT_PASSWORD = "benchpass"
+DEPARTMENTS = ["Engineering", "Sales", "HR", "Finance", "Support", "Marketing", "Product"]
+FEEDBACK_STATUSES = ["approved"] * 6 + ["rejected", "pending", "pending"]
+
+
+def email_for(user_id: int) -> str:
+    return f"user{user_id}@bench.local"
+
+
+def chunked_insert(conn, table, rows: Iterable[dict]) -> int:
+    """Inserts ``rows`` with one executemany per INSERT_CHUNK_SIZE rows; returns the row count."""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_CHUNK_SIZE:
+            conn.execute(insert(table), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+        total += len(batch)
+    return total
+
+
+class OrgSpec:
+    """Shape of the generated organisation: ids, managers, roles and departments."""
+
+    def __init__(self, users: int, span: int = 8, admins: int = 2):
+        self.users = users
+        self.span = max(span, 1)
+        self.admins = min(admins, users)
+        self.tree_size = users - self.admins
+
+    @property
+    def root_id(self) -> int:
+        return self.admins + 1
+
+    def manager_of(self, user_id: int):
+        k = user_id - self.root_id
+        if k <= 0:
+            return None
+        return self.root_id + (k - 1) // self.span
+
+    def has_reports(self, user_id: int) -> bool:
+        k = user_id - self.root_id
+        return k >= 0 and k * self.span + 1 < self.tree_size
+
+    def role_of(self, user_id: int) -> str:
+        if user_id <= self.admins:
+            return "Admin"
+        return "Manager" if self.has_reports(user_id) else "Employee"
+
+    def tree_ids(self) -> range:
+        return range(self.root_id, self.users + 1)
+
+    def depth(self) -> int:
+        depth, k = 0, self.tree_size - 1
+        while k > 0:
+            k = (k - 1) // self.span
+            depth += 1
+        return depth
+
+
+def _users(spec: OrgSpec, password_hash: str, rng: random.Random, created) -> Iterator[dict]:
+    departments = {}
+    for user_id in range(1, spec.users + 1):
+        manager_id = spec.manager_of(user_id)
+        if manager_id is None:
+            department = "HR" if user_id <= spec.admins else "Executive"
+        elif manager_id == spec.root_id:
+            department = DEPARTMENTS[(user_id - spec.root_id) % len(DEPARTMENTS)]
+        else:
+            department = departments[manager_id]
+        if spec.has_reports(user_id):
+            departments[user_id] = department
+        yield {
+            "id": user_id,
+            "name": f"User {user_id}",
+            "email": email_for(user_id),
+            "password_hash": password_hash,
+            "role": spec.role_of(user_id),
+            "department": department,
+            "manager_id": manager_id,
+            "is_active": rng.random() > 0.02,
+            "created_at": created(),
+        }
+
+
+def generate(
+    engine,
+    users: int,
+    reviews: int,
+    feedback: int,
+    kpi_results: int,
+    span: int = 8,
+    admins: int = 2,
+    kpis: int = 20,
+    days: int = 730,
+    seed: int = 42,
+    password_hash: str = "x",
+) -> OrgSpec:
+    """
+    Bulk-inserts a synthetic organisation into empty tables and returns its spec.
+    Reviews are written by each employee's manager; feedback and KPI results
+    go to random members of the tree.
+    """
+    from app.routes.kpi import score_kpi
+
+    rng = random.Random(seed)
+    spec = OrgSpec(users, span, admins)
+    first, last = spec.root_id + 1, spec.users
+    if last < first:
+        raise ValueError("Need at least two users in the org tree")
+    end = datetime.utcnow()
+    span_seconds = days * 24 * 3600
+
+    def created():
+        return end - timedelta(seconds=rng.randrange(span_seconds))
+
+    kpi_rows = [
+        {
+            "id": i,
+            "title": f"KPI {i}",
+            "target": float(rng.choice([10, 50, 90, 100, 1000])),
+            "weightage": round(rng.uniform(0.5, 1.5), 2),
+            "department": DEPARTMENTS[i % len(DEPARTMENTS)] if i % 3 else None,
+        }
+        for i in range(1, kpis + 1)
+    ]
+
+    def review_rows():
+        for _ in range(reviews):
+            employee_id = rng.randint(first, last)
+            yield {
+                "employee_id": employee_id,
+                "manager_id": spec.manager_of(employee_id),
+                "rating": round(rng.uniform(1, 5), 1),
+                "comments": "Synthetic review",
+                "created_at": created(),
+            }
+
+    def feedback_rows():
+        for _ in range(feedback):
+            created_at = created()
+            yield {
+                "from_user_id": rng.randint(spec.root_id, last),
+                "to_user_id": rng.randint(first, last),
+                "message": "Synthetic feedback",
+                "is_anonymous": rng.random() < 0.2,
+                "status": rng.choice(FEEDBACK_STATUSES),
+                "created_at": created_at,
+                # Bulk-loaded rows bypass the moderation queue
+                "moderated_at": created_at,
+            }
+
+    def result_rows():
+        for _ in range(kpi_results):
+            kpi = rng.choice(kpi_rows)
+            achieved_value = round(kpi["target"] * rng.uniform(0.5, 1.3), 2)
+            status, score = score_kpi(achieved_value, kpi["target"], kpi["weightage"])
+            yield {
+                "kpi_id": kpi["id"],
+                "employee_id": rng.randint(first, last),
+                "achieved_value": achieved_value,
+                "status": status,
+                "score": score,
+                "created_at": created(),
+            }
+
+    steps = [
+        ("users", models.User.__table__, _users(spec, password_hash, rng, created)),
+        ("kpis", models.KPI.__table__, kpi_rows),
+        ("performance_reviews", models.PerformanceReview.__table__, review_rows()),
+        ("feedback", models.Feedback.__table__, feedback_rows()),
+        ("kpi_results", models.KPIResult.__table__, result_rows()),
+    ]
+    for name, table, rows in steps:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            count = chunked_insert(conn, table, rows)
+        print(f"✓ Inserted {count:,} {name} in {time.perf_counter() - started:.1f}s")
+
+    if engine.dialect.name == "postgresql":
+        # Explicit ids leave the serial sequences behind
+        with engine.begin() as conn:
+            for table in ("users", "kpis"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+    return spec
+
+
+def reset(engine) -> None:
+    """Deletes every row from the application tables."""
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--span", type=int, default=8, help="Direct reports per manager")
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--feedback", type=int, default=1_000_000)
+    parser.add_argument("--kpi-results", type=int, default=1_000_000)
+    parser.add_argument("--kpis", type=int, default=20)
+    parser.add_argument("--days", type=int, default=730, help="Spread created_at over this many days")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Password of every generated user")
+    parser.add_argument("--reset", action="store_true", help="Delete all existing rows first")
+    args = parser.parse_args()
+
+    from app.auth import get_password_hash
+    from app.database import engine
+    from app.migrate import upgrade
+    from app import summaries, hierarchy, analytics, leaderboard
+
+    upgrade()
+    if args.reset:
+        reset(engine)
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(models.User.__table__)):
+            raise SystemExit("The database already has users; pass --reset to replace them")
+
+    started = time.perf_counter()
+    spec = generate(
+        engine,
+        users=args.users,
+        reviews=args.reviews,
+        feedback=args.feedback,
+        kpi_results=args.kpi_results,
+        span=args.span,
+        admins=args.admins,
+        kpis=args.kpis,
+        days=args.days,
+        seed=args.seed,
+        # One hash shared by every user: hashing 100k passwords would dominate the run
+        password_hash=get_password_hash(args.password),
+    )
+    with Session(engine) as db:
+        summaries.rebuild(db)
+        hierarchy.rebuild(db)
+        analytics.rebuild(db)
+        leaderboard.rebuild(db)
+        db.commit()
+    print(f"✓ Generated org of {spec.users:,} users (depth {spec.depth()}) in {time.perf_counter() - started:.1f}s")
+    print(f"  admin: {email_for(1) if spec.admins else '-'}  top manager: {email_for(spec.root_id)}  "
+          f"employee: {email_for(spec.users)}  password: {args.password}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+HTTP load benchmark: concurrent clients against a running server.
+
+    python -m benchmarks.datagen --users 100000 --reset       # once per database
+    uvicorn app.main:app --workers 4                          # USE_SQLITE=true or DATABASE_URL=...
+    python -m benchmarks.load --label sqlite
+    python -m benchmarks.load --label postgres --compare benchmarks/results/<earlier run>.json
+
+Each scenario exercises one endpoint of the auth, users, performance,
+feedback or kpi router. Scenarios run one after another, each with
+--concurrency clients issuing --requests requests in total. The report gives
+p50/p95/p99 latency and throughput per scenario. Results are saved as JSON
+under benchmarks/results/. --compare flags scenarios whose p95 latency
+regressed by more than --threshold percent, and exits with status 1 if any did.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import time
+from datetime import datetime
+from typing import Optional
+import httpx
+
+# Credentials created by benchmarks.datagen. The client deliberately doesn't import
+# the app, so it runs anywhere httpx is installed.
+DEFAULT_ADMIN_EMAIL = "user1@bench.local"
+DEFAULT_PASSWORD = "benchpass"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# name -> (method, path, role whose token is used, body builder or None).
+# Paths may reference {manager_id} and {employee_id}.
+SCENARIOS = {
+    "auth.health": ("GET", "/api/auth/health", None, None),
+    "auth.login": ("POST", "/api/auth/login", None, "login"),
+    "users.list": ("GET", "/api/users/?limit=100", "admin", None),
+    "users.team": ("GET", "/api/users/?manager_id={manager_id}&limit=100", "admin", None),
+    "users.dashboard_admin": ("GET", "/api/users/dashboard/admin", "admin", None),
+    "users.dashboard_manager": ("GET", "/api/users/dashboard/manager", "manager", None),
+    "users.dashboard_employee": ("GET", "/api/users/dashboard/employee", "employee", None),
+    "performance.me": ("GET", "/api/performance/me", "employee", None),
+    "performance.list": ("GET", "/api/performance/?limit=100", "admin", None),
+    "performance.employee": ("GET", "/api/performance/employee/{employee_id}", "manager", None),
+    "feedback.me": ("GET", "/api/feedback/me", "employee", None),
+    "feedback.pending": ("GET", "/api/feedback/?status=pending&limit=100", "admin", None),
+    "feedback.create": ("POST", "/api/feedback/", "employee", "feedback"),
+    "kpi.list": ("GET", "/api/kpi/", "manager", None),
+}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Context:
+    """Tokens and ids shared by the scenarios."""
+
+    def __init__(self, password: str):
+        self.password = password
+        self.tokens = {}
+        self.emails = {}
+        self.ids = {}
+
+    async def login(self, client: httpx.AsyncClient, role: str, email: str) -> None:
+        response = await client.post("/api/auth/login", data={"username": email, "password": self.password})
+        response.raise_for_status()
+        self.tokens[role] = response.json()["access_token"]
+        self.emails[role] = email
+
+    def headers(self, role: Optional[str]) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[role]}"} if role else {}
+
+
+async def prepare(client: httpx.AsyncClient, admin_email: str, password: str) -> Context:
+    """Logs in as an admin, then as the first manager and an employee of that manager."""
+    ctx = Context(password)
+    await ctx.login(client, "admin", admin_email)
+    admin = ctx.headers("admin")
+
+    managers = (await client.get("/api/users/?role=Manager&limit=1", headers=admin)).json()
+    if not managers:
+        raise SystemExit("No managers found; generate data with `python -m benchmarks.datagen` first")
+    manager = managers[0]
+    team = (await client.get(f"/api/users/?manager_id={manager['id']}&limit=1", headers=admin)).json()
+    if not team:
+        raise SystemExit(f"Manager {manager['email']} has no direct reports")
+    employee = team[0]
+
+    await ctx.login(client, "manager", manager["email"])
+    await ctx.login(client, "employee", employee["email"])
+    ctx.ids = {"manager_id": manager["id"], "employee_id": employee["id"]}
+    return ctx
+
+
+def _body(kind: Optional[str], ctx: Context) -> dict:
+    if kind == "login":
+        return {"data": {"username": ctx.emails["employee"], "password": ctx.password}}
+    if kind == "feedback":
+        return {"json": {"to_user_id": ctx.ids["manager_id"], "message": "Load test feedback"}}
+    return {}
+
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, name: str, requests: int, concurrency: int) -> dict:
+    method, path, role, body = SCENARIOS[name]
+    url = path.format(**ctx.ids)
+    headers = ctx.headers(role)
+    kwargs = _body(body, ctx)
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, headers=headers, **kwargs)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, requests))])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+async def run(args) -> dict:
+    names = [n for n in SCENARIOS if not args.scenarios or n.split(".")[0] in args.scenarios or n in args.scenarios]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        ctx = await prepare(client, args.admin_email, args.password)
+        results = {}
+        for name in names:
+            # A short warm-up so connection setup and cold caches don't skew the percentiles
+            await run_scenario(client, ctx, name, min(args.concurrency * 2, args.requests), args.concurrency)
+            results[name] = await run_scenario(client, ctx, name, args.requests, args.concurrency)
+            r = results[name]
+            print(f"{name:<26} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                  f"{r['p99_ms']:>8.1f} {r['errors']:>6}")
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Prints p95/throughput deltas against a baseline run and returns the regressed scenarios."""
+    regressed = []
+    print()
+    print(f"Compared with {baseline.get('label')} ({baseline.get('started_at')}, commit {baseline.get('git_commit')}):")
+    print(f"{'scenario':<26} {'p95 ms':>16} {'change':>8} {'rps change':>11}")
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        p95_change = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        rps_change = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0.0
+        flag = ""
+        if p95_change > threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<26} {before['p95_ms']:>7.1f} -> {result['p95_ms']:>6.1f} {p95_change:>+7.1f}% {rps_change:>+10.1f}%{flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--label", default="local", help="Name of this run, e.g. the database backend")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=None,
+                        help="Comma-separated routers or scenario names (default: all)")
+    parser.add_argument("--admin-email", default=DEFAULT_ADMIN_EMAIL)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="p95 regression threshold in percent")
+    parser.add_argument("--no-save", action="store_true", help="Don't write a results file")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<26} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    started_at = datetime.now()
+    scenarios = asyncio.run(run(args))
+    report = {
+        "label": args.label,
+        "base_url": args.base_url,
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scenarios": scenarios,
+    }
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{started_at:%Y%m%d-%H%M%S}-{args.label}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results saved to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of the feedback moderation engines.
+
+    python -m benchmarks.moderation
+    python -m benchmarks.moderation --terms 100 10000 100000 --lengths 200 20000
+
+For every term-list size the synthetic list is compiled once per engine, then
+the same messages are checked with each engine and with the previous
+implementation (a substring scan per term). The report gives compile time and
+microseconds per message for each message length. All engines must agree on
+which messages are blocked.
+"""
+import argparse
+import random
+import string
+import time
+from app.moderation import ENGINES, normalize, parse_terms
+
+WORDS = ["great", "work", "on", "the", "release", "thanks", "for", "helping", "team", "review", "code", "meeting"]
+
+
+def make_terms(count: int, rng: random.Random) -> list:
+    terms = set()
+    while len(terms) < count:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+        terms.add(word + ("*" if rng.random() < 0.2 else ""))
+    return parse_terms(sorted(terms))
+
+
+def make_messages(count: int, length: int, terms: list, rng: random.Random) -> list:
+    """Filler text of about ``length`` characters; every other message contains a (possibly leetspeak) term."""
+    messages = []
+    for i in range(count):
+        words = []
+        while sum(len(w) + 1 for w in words) < length:
+            words.append(rng.choice(WORDS))
+        if i % 2:
+            term = rng.choice(terms).rstrip("*").replace("o", "0").replace("e", "3")
+            words.insert(rng.randrange(len(words)), term.upper() if rng.random() < 0.5 else term)
+        messages.append(" ".join(words))
+    return messages
+
+
+def naive(terms: list):
+    """The previous implementation: one substring scan per term."""
+    words = [t.rstrip("*") for t in terms]
+
+    def find(text: str) -> bool:
+        text = normalize(text)
+        return any(w in text for w in words)
+    return find
+
+
+def timed(check, messages: list) -> tuple:
+    started = time.perf_counter()
+    results = [bool(check(m)) for m in messages]
+    return (time.perf_counter() - started) / len(messages) * 1e6, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, nargs="+", default=[10, 1000, 10000, 50000])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[200, 5000])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'terms':>7} {'length':>7} {'engine':<14} {'compile ms':>11} {'us/message':>11}")
+    for count in args.terms:
+        terms = make_terms(count, rng)
+        compiled = {}
+        for name, engine in ENGINES.items():
+            started = time.perf_counter()
+            compiled[name] = (engine(terms), (time.perf_counter() - started) * 1000)
+        for length in args.lengths:
+            messages = make_messages(args.messages, length, terms, rng)
+            expected = None
+            for name, (matcher, compile_ms) in compiled.items():
+                per_message, results = timed(lambda m: matcher.find(m, first=True), messages)
+                if expected is not None and results != expected:
+                    raise SystemExit(f"{name} disagrees with {next(iter(compiled))}")
+                expected = results
+                print(f"{count:>7} {length:>7} {name:<14} {compile_ms:>11.1f} {per_message:>11.1f}")
+            per_message, _ = timed(naive(terms), messages[:max(1, args.messages // 10)])
+            print(f"{count:>7} {length:>7} {'substring scan':<14} {'-':>11} {per_message:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
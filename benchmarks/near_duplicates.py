@@ -0,0 +1,109 @@
+"""
+Micro-benchmark of the feedback near-duplicate index.
+
+    python -m benchmarks.near_duplicates
+    python -m benchmarks.near_duplicates --entries 10000 100000 --recipients 50
+
+For every index size, synthetic feedback is spread over the recipients and
+indexed without a database. Three kinds of message are then looked up: lightly
+edited copies of indexed messages (which should be found), and unrelated
+messages (which should not). The report gives the indexing cost and the median
+and 99th percentile lookup latency. It compares these with an exact scan,
+which computes the shingle Jaccard similarity against every message to the
+same recipient.
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+from app import near_duplicates
+from app.near_duplicates import NearDuplicateIndex, NEAR_DUPLICATE_THRESHOLD, SHINGLE_SIZE
+
+WORDS = (
+    "great work on the release thanks for helping team review code meeting customer demo "
+    "sprint planning documentation onboarding support incident quality design roadmap "
+    "always clear communication proactive ownership mentoring improved pipeline latency"
+).split()
+
+
+def make_message(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 40)))
+
+
+def edit(message: str, rng: random.Random) -> str:
+    """A copy with one word replaced and different spacing/case, as in copy-pasted spam."""
+    words = message.split()
+    words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return "  ".join(words).upper() if rng.random() < 0.3 else " ".join(words) + "!"
+
+
+def shingles(text: str) -> set:
+    text = near_duplicates._canonical(text)
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def exact_find(by_recipient: dict, to_user_id: int, message: str):
+    query = shingles(message)
+    best = None
+    for feedback_id, other in by_recipient.get(to_user_id, ()):
+        score = len(query & other) / len(query | other)
+        if score >= NEAR_DUPLICATE_THRESHOLD and (best is None or score > best[1]):
+            best = (feedback_id, score)
+    return best
+
+
+def percentiles(samples: list) -> tuple:
+    samples = sorted(samples)
+    return statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--recipients", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'entries':>8} {'method':<8} {'index us/msg':>13} {'p50 us':>9} {'p99 us':>9} {'recall':>7} {'false pos':>10}")
+    for count in args.entries:
+        messages = [(i + 1, rng.randint(1, args.recipients), make_message(rng)) for i in range(count)]
+        now = datetime.utcnow()
+        index = NearDuplicateIndex(max_entries=count)
+        started = time.perf_counter()
+        for feedback_id, to_user_id, message in messages:
+            index.add(feedback_id, to_user_id, message, now)
+        index_us = (time.perf_counter() - started) / count * 1e6
+
+        by_recipient = {}
+        started = time.perf_counter()
+        for feedback_id, to_user_id, message in messages:
+            by_recipient.setdefault(to_user_id, []).append((feedback_id, shingles(message)))
+        exact_index_us = (time.perf_counter() - started) / count * 1e6
+
+        copies = [(to_user_id, edit(message, rng)) for _, to_user_id, message in rng.sample(messages, args.lookups)]
+        unrelated = [(rng.randint(1, args.recipients), make_message(rng)) for _ in range(args.lookups)]
+        # Whether each edited copy really is above the threshold decides what counts as recall
+        expected = [exact_find(by_recipient, to_user_id, message) is not None for to_user_id, message in copies]
+
+        for name, find, index_cost in (
+            ("minhash", lambda to_user_id, message: index.find(to_user_id, message), index_us),
+            ("exact", lambda to_user_id, message: exact_find(by_recipient, to_user_id, message), exact_index_us),
+        ):
+            timings, found, false_positives = [], [], 0
+            for to_user_id, message in copies + unrelated:
+                started = time.perf_counter()
+                match = find(to_user_id, message)
+                timings.append(time.perf_counter() - started)
+                found.append(match is not None)
+            hits = sum(f for f, e in zip(found, expected) if e)
+            false_positives = sum(found[len(copies):])
+            p50, p99 = percentiles(timings)
+            recall = hits / max(1, sum(expected))
+            print(f"{count:>8} {name:<8} {index_cost:>13.1f} {p50:>9.1f} {p99:>9.1f} {recall:>7.1%} {false_positives:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,18 @@ const TOKEN_KEY = 'token';
  * @returns {Promise<any>} - The JSON response from the API
  */
 async function apiRequest(endpoint, method = 'GET', body = null) {
+    const response = await apiFetch(endpoint, method, body);
+    return response.json();
+}
+
+/**
+ * Performs an API request and returns the raw response, throwing on errors
+ * @param {string} endpoint - The API endpoint to call
+ * @param {string} method - HTTP method (GET, POST, PUT, DELETE)
+ * @param {object} body - The request body for POST/PUT requests
+ * @returns {Promise<Response>} - The fetch response
+ */
+async function apiFetch(endpoint, method = 'GET', body = null) {
     const headers = {
         'Content-Type': 'application/json',
         'Authorization': `Bearer ${localStorage.getItem(TOKEN_KEY)}`
@@ -26,13 +38,49 @@ async function apiRequest(endpoint, method = 'GET', body = null) {
             const error = await response.json();
             throw new Error(error.detail || error.message || 'API request failed');
         }
-        return response.json();
+        return response;
     } catch (error) {
         console.error('API Error:', error);
         throw error;
     }
 }
 
+/**
+ * Fetches a single page from a paginated list endpoint
+ * @param {string} endpoint - The list endpoint, optionally with query parameters
+ * @param {string|null} cursor - The cursor returned with the previous page
+ * @param {number} limit - Maximum number of items to return
+ * @returns {Promise<{items: Array, nextCursor: string|null}>} - The page and the cursor for the next one
+ */
+async function apiRequestPage(endpoint, cursor = null, limit = 100) {
+    const params = new URLSearchParams({ limit });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const response = await apiFetch(`${endpoint}${separator}${params}`);
+    return {
+        items: await response.json(),
+        nextCursor: response.headers.get('X-Next-Cursor')
+    };
+}
+
+/**
+ * Fetches every page of a paginated list endpoint
+ * @param {string} endpoint - The list endpoint, optionally with query parameters
+ * @returns {Promise<Array>} - All items across pages
+ */
+async function apiRequestAll(endpoint) {
+    const items = [];
+    let cursor = null;
+    do {
+        const page = await apiRequestPage(endpoint, cursor, 1000);
+        items.push(...page.items);
+        cursor = page.nextCursor;
+    } while (cursor);
+    return items;
+}
+
 /**
  * Checks for a valid token and redirects to login if not found
  */
@@ -0,0 +1,64 @@
+from logging.config import fileConfig
+from alembic import context
+from app.database import Base, engine
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # The full-text indexes (migration 0007) are dialect-specific and not declared
+    # on the models: SQLite FTS5 tables with their shadow tables, PostgreSQL GIN indexes
+    if reflected and compare_to is None:
+        if type_ == "table" and "_fts" in name:
+            return False
+        if type_ == "index" and name.endswith("_search"):
+            return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Emits the migration SQL to stdout (alembic upgrade head --sql)."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # A caller may pass its own connection (config.attributes["connection"]), e.g. to migrate a copy
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_on(connection)
+        return
+    with engine.connect() as connection:
+        _run_on(connection)
+
+
+def _run_on(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite cannot ALTER most constraints in place; batch mode rebuilds the table
+        render_as_batch=connection.dialect.name == "sqlite",
+        include_object=include_object,
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
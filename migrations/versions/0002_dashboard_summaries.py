@@ -0,0 +1,115 @@
+"""Materialized dashboard summaries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Same figures as app.summaries.rebuild: one row per user, one per manager over
+# their direct reports, and a global row over the whole source tables (so the
+# activity of deleted users still counts there). Without them, the first write
+# would create zeroed rows and the dashboards would read those.
+COLUMNS = """scope, owner_id, member_count, review_count, rating_count, rating_sum, latest_rating,
+    latest_review_at, feedback_count, pending_feedback_count, kpi_total, kpi_achieved, updated_at"""
+BACKFILL_USERS = f"""
+INSERT INTO dashboard_summaries ({COLUMNS})
+SELECT 'user', u.id, 1, COALESCE(r.n, 0), COALESCE(r.rated, 0), COALESCE(r.total, 0.0), l.rating,
+    l.created_at, COALESCE(f.n, 0), COALESCE(f.pending, 0), COALESCE(k.n, 0), COALESCE(k.achieved, 0),
+    CURRENT_TIMESTAMP
+FROM users u
+LEFT JOIN (
+    SELECT employee_id, COUNT(*) AS n, COUNT(rating) AS rated, SUM(rating) AS total
+    FROM performance_reviews GROUP BY employee_id
+) r ON r.employee_id = u.id
+LEFT JOIN (
+    SELECT employee_id, rating, created_at,
+        ROW_NUMBER() OVER (PARTITION BY employee_id ORDER BY created_at DESC, id DESC) AS rn
+    FROM performance_reviews WHERE rating IS NOT NULL
+) l ON l.employee_id = u.id AND l.rn = 1
+LEFT JOIN (
+    SELECT to_user_id, COUNT(*) AS n, SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) AS pending
+    FROM feedback GROUP BY to_user_id
+) f ON f.to_user_id = u.id
+LEFT JOIN (
+    SELECT employee_id, COUNT(*) AS n, SUM(CASE WHEN status = 'Achieved' THEN 1 ELSE 0 END) AS achieved
+    FROM kpi_results GROUP BY employee_id
+) k ON k.employee_id = u.id
+"""
+BACKFILL_MANAGERS = f"""
+INSERT INTO dashboard_summaries ({COLUMNS})
+SELECT 'manager', u.manager_id, COUNT(*), SUM(s.review_count), SUM(s.rating_count), SUM(s.rating_sum),
+    (
+        SELECT latest.latest_rating FROM dashboard_summaries latest
+        JOIN users report ON report.id = latest.owner_id
+        WHERE latest.scope = 'user' AND report.manager_id = u.manager_id AND latest.latest_review_at IS NOT NULL
+        ORDER BY latest.latest_review_at DESC LIMIT 1
+    ),
+    MAX(s.latest_review_at), SUM(s.feedback_count), SUM(s.pending_feedback_count), SUM(s.kpi_total),
+    SUM(s.kpi_achieved), CURRENT_TIMESTAMP
+FROM dashboard_summaries s JOIN users u ON u.id = s.owner_id
+WHERE s.scope = 'user' AND u.manager_id IS NOT NULL AND u.manager_id <> 0
+GROUP BY u.manager_id
+"""
+LATEST_REVIEW = "SELECT {column} FROM performance_reviews WHERE rating IS NOT NULL ORDER BY created_at DESC, id DESC LIMIT 1"
+BACKFILL_GLOBAL = f"""
+INSERT INTO dashboard_summaries ({COLUMNS})
+SELECT 'global', 0,
+    (SELECT COUNT(*) FROM users),
+    (SELECT COUNT(*) FROM performance_reviews),
+    (SELECT COUNT(rating) FROM performance_reviews),
+    (SELECT COALESCE(SUM(rating), 0.0) FROM performance_reviews),
+    ({LATEST_REVIEW.format(column="rating")}),
+    ({LATEST_REVIEW.format(column="created_at")}),
+    (SELECT COUNT(*) FROM feedback),
+    (SELECT COUNT(*) FROM feedback WHERE status = 'pending'),
+    (SELECT COUNT(*) FROM kpi_results),
+    (SELECT COUNT(*) FROM kpi_results WHERE status = 'Achieved'),
+    CURRENT_TIMESTAMP
+"""
+
+
+def upgrade() -> None:
+    # Databases adopted from create_all may already have the table, kept current
+    # by the old startup rebuild; it is only filled here if it is empty
+    if not sa.inspect(op.get_bind()).has_table("dashboard_summaries"):
+        _create_table()
+    if op.get_bind().execute(sa.text("SELECT COUNT(*) FROM dashboard_summaries")).scalar():
+        return
+    op.execute(BACKFILL_USERS)
+    op.execute(BACKFILL_MANAGERS)
+    op.execute(BACKFILL_GLOBAL)
+
+
+def _create_table() -> None:
+    op.create_table(
+        "dashboard_summaries",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("scope", sa.String(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("member_count", sa.Integer(), nullable=False),
+        sa.Column("review_count", sa.Integer(), nullable=False),
+        sa.Column("rating_count", sa.Integer(), nullable=False),
+        sa.Column("rating_sum", sa.Float(), nullable=False),
+        sa.Column("latest_rating", sa.Float(), nullable=True),
+        sa.Column("latest_review_at", sa.DateTime(), nullable=True),
+        sa.Column("feedback_count", sa.Integer(), nullable=False),
+        sa.Column("pending_feedback_count", sa.Integer(), nullable=False),
+        sa.Column("kpi_total", sa.Integer(), nullable=False),
+        sa.Column("kpi_achieved", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("scope", "owner_id", name="uq_dashboard_summaries_scope_owner"),
+    )
+    op.create_index("ix_dashboard_summaries_id", "dashboard_summaries", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("dashboard_summaries")
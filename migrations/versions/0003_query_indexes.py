@@ -0,0 +1,48 @@
+"""Composite indexes for the route queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, PostgreSQL INCLUDE columns)
+INDEXES = [
+    ("ix_users_manager_id", "users", ["manager_id"], None),
+    ("ix_users_name", "users", ["name"], None),
+    ("ix_users_department_role", "users", ["department", "role"], None),
+    ("ix_performance_reviews_employee_created", "performance_reviews", ["employee_id", "created_at", "id"], ["rating"]),
+    ("ix_performance_reviews_manager_created", "performance_reviews", ["manager_id", "created_at", "id"], None),
+    ("ix_performance_reviews_created", "performance_reviews", ["created_at", "id"], None),
+    ("ix_feedback_to_user_created", "feedback", ["to_user_id", "created_at", "id"], ["status"]),
+    ("ix_feedback_status_created", "feedback", ["status", "created_at", "id"], None),
+    ("ix_feedback_created", "feedback", ["created_at", "id"], None),
+    ("ix_kpi_results_kpi_employee", "kpi_results", ["kpi_id", "employee_id"], None),
+    ("ix_kpi_results_employee_status", "kpi_results", ["employee_id", "status"], None),
+    ("ix_kpi_results_status", "kpi_results", ["status"], None),
+    ("ix_kpi_results_created", "kpi_results", ["created_at", "id"], None),
+]
+
+
+def upgrade() -> None:
+    postgres = op.get_bind().dialect.name == "postgresql"
+    # On PostgreSQL build the indexes CONCURRENTLY, outside a transaction, so
+    # large tables stay writable while the migration runs.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            options = {"postgresql_concurrently": True, "postgresql_include": include or []} if postgres else {}
+            op.create_index(name, table, columns, if_not_exists=True, **options)
+
+
+def downgrade() -> None:
+    postgres = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            options = {"postgresql_concurrently": True} if postgres else {}
+            op.drop_index(name, table_name=table, if_exists=True, **options)
@@ -0,0 +1,46 @@
+"""Org hierarchy closure table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Same recursive walk as app.hierarchy.rebuild; the depth bound stops a
+# manager_id cycle in existing data from recursing forever.
+BACKFILL = """
+WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM users
+    UNION ALL
+    SELECT tree.ancestor_id, users.id, tree.depth + 1
+    FROM tree JOIN users ON users.manager_id = tree.descendant_id
+    WHERE tree.depth < 256
+)
+INSERT INTO org_hierarchy (ancestor_id, descendant_id, depth)
+SELECT ancestor_id, descendant_id, depth FROM tree
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "org_hierarchy",
+        sa.Column("ancestor_id", sa.Integer(), nullable=False),
+        sa.Column("descendant_id", sa.Integer(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["ancestor_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["descendant_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id"),
+    )
+    op.create_index("ix_org_hierarchy_descendant", "org_hierarchy", ["descendant_id", "depth"])
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table("org_hierarchy")
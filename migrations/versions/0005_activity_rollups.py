@@ -0,0 +1,59 @@
+"""Daily activity rollups for the analytics time series
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Same figures as app.analytics.rebuild, grouped by UTC day in SQL
+BACKFILL = """
+INSERT INTO activity_rollups
+    (employee_id, day, review_count, rating_count, rating_sum, feedback_count, kpi_total, kpi_achieved)
+SELECT employee_id, day, SUM(review_count), SUM(rating_count), SUM(rating_sum),
+       SUM(feedback_count), SUM(kpi_total), SUM(kpi_achieved)
+FROM (
+    SELECT employee_id, {day} AS day, COUNT(*) AS review_count, COUNT(rating) AS rating_count,
+           COALESCE(SUM(rating), 0.0) AS rating_sum, 0 AS feedback_count, 0 AS kpi_total, 0 AS kpi_achieved
+    FROM performance_reviews WHERE employee_id IS NOT NULL AND created_at IS NOT NULL
+    GROUP BY employee_id, {day}
+    UNION ALL
+    SELECT to_user_id, {day}, 0, 0, 0.0, COUNT(*), 0, 0
+    FROM feedback WHERE created_at IS NOT NULL
+    GROUP BY to_user_id, {day}
+    UNION ALL
+    SELECT employee_id, {day}, 0, 0, 0.0, 0, COUNT(*), SUM(CASE WHEN status = 'Achieved' THEN 1 ELSE 0 END)
+    FROM kpi_results WHERE employee_id IS NOT NULL AND created_at IS NOT NULL
+    GROUP BY employee_id, {day}
+) activity
+GROUP BY employee_id, day
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "activity_rollups",
+        sa.Column("employee_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("review_count", sa.Integer(), nullable=False),
+        sa.Column("rating_count", sa.Integer(), nullable=False),
+        sa.Column("rating_sum", sa.Float(), nullable=False),
+        sa.Column("feedback_count", sa.Integer(), nullable=False),
+        sa.Column("kpi_total", sa.Integer(), nullable=False),
+        sa.Column("kpi_achieved", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("employee_id", "day"),
+    )
+    op.create_index("ix_activity_rollups_day", "activity_rollups", ["day"])
+    day = "date(created_at)" if op.get_bind().dialect.name == "sqlite" else "CAST(created_at AS DATE)"
+    op.execute(BACKFILL.format(day=day))
+
+
+def downgrade() -> None:
+    op.drop_table("activity_rollups")
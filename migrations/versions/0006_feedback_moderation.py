@@ -0,0 +1,29 @@
+"""Moderation results on feedback
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("feedback", sa.Column("moderation_score", sa.Float(), nullable=True))
+    op.add_column("feedback", sa.Column("moderation_flags", sa.String(), nullable=True))
+    op.add_column("feedback", sa.Column("moderated_at", sa.DateTime(), nullable=True))
+    # Existing feedback is left to the managers; only new submissions go through the queue
+    op.execute("UPDATE feedback SET moderated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("feedback") as batch:
+        batch.drop_column("moderated_at")
+        batch.drop_column("moderation_flags")
+        batch.drop_column("moderation_score")
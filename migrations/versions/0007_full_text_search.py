@@ -0,0 +1,67 @@
+"""Full-text indexes on feedback messages and review comments
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+PostgreSQL: GIN indexes on the same to_tsvector() expressions app/search.py
+queries, maintained by PostgreSQL itself.
+SQLite: FTS5 tables over the source tables (external content), kept in sync
+by triggers. A batch (copy-and-move) migration of feedback or
+performance_reviews drops the triggers; run ``python -m app.search`` after one.
+"""
+from alembic import op
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# (table, text column); the same list as app.search.SOURCES, and the same DDL as app.search.SQLITE_DDL
+SOURCES = [("feedback", "message"), ("performance_reviews", "comments")]
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+        {column}, content='{table}', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts (rowid, {column}) VALUES (new.id, new.{column});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {column} ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, {column}) VALUES ('delete', old.id, old.{column});
+        INSERT INTO {table}_fts (rowid, {column}) VALUES (new.id, new.{column});
+    END""",
+    # Indexes the existing rows
+    "INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for table, column in SOURCES:
+            for statement in SQLITE_DDL:
+                op.execute(statement.format(table=table, column=column))
+        return
+    # Built CONCURRENTLY, outside a transaction, so the tables stay writable
+    with op.get_context().autocommit_block():
+        for table, column in SOURCES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_{column}_search ON {table} "
+                f"USING gin (to_tsvector('english'::regconfig, coalesce({column}, '')))"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        for table, _ in SOURCES:
+            for action in ("insert", "delete", "update"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{action}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        return
+    with op.get_context().autocommit_block():
+        for table, column in SOURCES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_{column}_search")
@@ -0,0 +1,62 @@
+"""KPI standings and totals for the leaderboards
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Same figures as app.leaderboard.rebuild: the latest (highest id) result per
+# KPI and existing employee, then their sum per employee
+BACKFILL_STANDINGS = """
+INSERT INTO kpi_standings (kpi_id, employee_id, score)
+SELECT r.kpi_id, r.employee_id, COALESCE(r.score, 0.0)
+FROM kpi_results r
+JOIN (
+    SELECT MAX(id) AS id FROM kpi_results
+    WHERE kpi_id IS NOT NULL AND employee_id IS NOT NULL
+    GROUP BY kpi_id, employee_id
+) latest ON latest.id = r.id
+JOIN users u ON u.id = r.employee_id
+"""
+BACKFILL_TOTALS = """
+INSERT INTO kpi_totals (employee_id, department, total_score, kpi_count)
+SELECT s.employee_id, u.department, SUM(s.score), COUNT(*)
+FROM kpi_standings s JOIN users u ON u.id = s.employee_id
+GROUP BY s.employee_id, u.department
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "kpi_standings",
+        sa.Column("kpi_id", sa.Integer(), nullable=False),
+        sa.Column("employee_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("kpi_id", "employee_id"),
+    )
+    op.create_index("ix_kpi_standings_kpi_score", "kpi_standings", ["kpi_id", "score"])
+    op.create_table(
+        "kpi_totals",
+        sa.Column("employee_id", sa.Integer(), nullable=False),
+        sa.Column("department", sa.String(), nullable=True),
+        sa.Column("total_score", sa.Float(), nullable=False),
+        sa.Column("kpi_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("employee_id"),
+    )
+    op.create_index("ix_kpi_totals_department_score", "kpi_totals", ["department", "total_score"])
+    op.create_index("ix_kpi_totals_score", "kpi_totals", ["total_score"])
+    op.execute(BACKFILL_STANDINGS)
+    op.execute(BACKFILL_TOTALS)
+
+
+def downgrade() -> None:
+    op.drop_table("kpi_totals")
+    op.drop_table("kpi_standings")
@@ -0,0 +1,50 @@
+import os
+
+os.environ.setdefault("USE_SQLITE", "true")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import http_cache, metrics
+from app.dependencies import Principal, principal_cache, token_cache
+
+TOKEN = "test-token"
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/api/kpi/")
+    def list_kpis():
+        return [{"id": 1, "title": "Sales Target"}]
+
+    app.add_middleware(http_cache.ResponseCacheMiddleware)
+    app.add_middleware(metrics.MetricsMiddleware)
+    token_cache.set(TOKEN, 1)
+    principal_cache.set(1, Principal(1, "Admin", "admin@example.com", "Admin", None, None, True))
+    return TestClient(app)
+
+
+def test_cache_hits_are_counted_under_their_route():
+    http_cache.cache.clear()
+    metrics._routes.pop(("GET", "/api/kpi/"), None)
+    client = _client()
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+
+    first = client.get("/api/kpi/", headers=headers)
+    assert client.get("/api/kpi/", headers=headers).status_code == 200
+    assert http_cache.cache.hits >= 1
+    revalidated = client.get("/api/kpi/", headers={**headers, "If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    assert metrics._routes[("GET", "/api/kpi/")].statuses == {200: 2, 304: 1}
+    assert ("GET", "<unmatched>") not in metrics._routes
+
+
+def test_if_modified_since_alone_is_not_a_match():
+    http_cache.cache.clear()
+    client = _client()
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+
+    response = client.get("/api/kpi/", headers={**headers, "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
+    assert "last-modified" not in response.headers
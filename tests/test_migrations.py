@@ -0,0 +1,49 @@
+import os
+import shutil
+
+os.environ.setdefault("USE_SQLITE", "true")
+
+import pytest
+from alembic import command
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app import dashboard, migrate, models, summaries
+
+# The tracked sample database predates the migrations (created by create_all)
+LEGACY_DB = os.path.join(migrate.ROOT, "employee.db")
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    path = tmp_path / "legacy.db"
+    shutil.copy(LEGACY_DB, path)
+    engine = create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+def _upgrade(engine) -> None:
+    config = migrate.alembic_config()
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.stamp(config, migrate.BASELINE)
+        command.upgrade(config, "head")
+        connection.commit()
+
+
+def test_upgraded_legacy_database_keeps_dashboards_correct_after_a_write(legacy_engine):
+    _upgrade(legacy_engine)
+    with Session(legacy_engine) as db:
+        manager_id = db.query(models.User.manager_id).filter(models.User.manager_id.isnot(None)).first()[0]
+        employee_id = db.query(models.User.id).filter(models.User.manager_id == manager_id).first()[0]
+        review = models.PerformanceReview(employee_id=employee_id, manager_id=manager_id, rating=4.0, comments="Solid quarter")
+        db.add(review)
+        db.flush()
+        summaries.record_review(db, review)
+        db.commit()
+
+        admin = dashboard.admin_summary(db)
+        expected = dashboard._aggregate_admin(db)
+        assert admin["total_employees"] == expected["total_employees"] > 0
+        assert admin == pytest.approx(expected)
+        assert dashboard.manager_summary(db, manager_id) == pytest.approx(dashboard._aggregate_manager(db, manager_id))